@@ -0,0 +1,38 @@
+"""One active live session per workroom
+
+Revision ID: 3f1c2a9b7d40
+Revises:
+Create Date: 2026-10-16 23:40:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '3f1c2a9b7d40'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table("workroom_live_sessions"):
+        return
+    # Before every node shared one row, each could open its own; keep the newest open
+    op.execute("""
+        UPDATE workroom_live_sessions
+        SET is_active = false, ended_at = COALESCE(ended_at, timezone('utc', now()))
+        WHERE is_active AND id NOT IN (
+            SELECT DISTINCT ON (workroom_id) id
+            FROM workroom_live_sessions
+            WHERE is_active
+            ORDER BY workroom_id, created_at DESC NULLS LAST, id DESC
+        )
+    """)
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_workroom_live_sessions_active "
+        "ON workroom_live_sessions (workroom_id) WHERE is_active"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS uq_workroom_live_sessions_active")
@@ -0,0 +1,67 @@
+"""One streak row per user and one level row per user and category
+
+Revision ID: 8b52e0c4a1f6
+Revises: 3f1c2a9b7d40
+Create Date: 2026-10-17 00:30:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '8b52e0c4a1f6'
+down_revision = '3f1c2a9b7d40'
+branch_labels = None
+depends_on = None
+
+
+def has_unique(inspector, table: str, columns: list) -> bool:
+    """Whether a unique constraint or index already covers exactly these columns"""
+    constraints = inspector.get_unique_constraints(table) + [
+        index for index in inspector.get_indexes(table) if index["unique"]
+    ]
+    return any(sorted(constraint["column_names"]) == sorted(columns) for constraint in constraints)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if inspector.has_table("user_streaks") and not has_unique(inspector, "user_streaks", ["user_id"]):
+        # Before the upsert, concurrent completions could each insert a streak; keep the most
+        # recently active row and carry over the best streak any of them reached
+        op.execute("""
+            UPDATE user_streaks AS kept
+            SET highest_streak = best.highest_streak
+            FROM (
+                SELECT user_id, MAX(GREATEST(highest_streak, current_streak)) AS highest_streak
+                FROM user_streaks
+                GROUP BY user_id
+                HAVING COUNT(*) > 1
+            ) AS best
+            WHERE kept.user_id = best.user_id
+        """)
+        op.execute("""
+            DELETE FROM user_streaks
+            WHERE id NOT IN (
+                SELECT DISTINCT ON (user_id) id
+                FROM user_streaks
+                ORDER BY user_id, last_active_date DESC NULLS LAST, current_streak DESC NULLS LAST, id
+            )
+        """)
+        op.create_unique_constraint("user_streaks_user_id_key", "user_streaks", ["user_id"])
+
+    if inspector.has_table("user_levels") and not has_unique(inspector, "user_levels", ["user_id", "level_category"]):
+        # Duplicates hold recomputed totals rather than increments, so keep the largest
+        op.execute("""
+            DELETE FROM user_levels
+            WHERE id NOT IN (
+                SELECT DISTINCT ON (user_id, level_category) id
+                FROM user_levels
+                ORDER BY user_id, level_category, level_points DESC NULLS LAST, id
+            )
+        """)
+        op.create_unique_constraint("uq_user_levels_user_category", "user_levels", ["user_id", "level_category"])
+
+
+def downgrade():
+    op.execute("ALTER TABLE user_levels DROP CONSTRAINT IF EXISTS uq_user_levels_user_category")
+    op.execute("ALTER TABLE user_streaks DROP CONSTRAINT IF EXISTS user_streaks_user_id_key")
@@ -0,0 +1,22 @@
+"""Record the day each user last got the daily completion bonus
+
+Revision ID: c4e9d17a3b82
+Revises: 8b52e0c4a1f6
+Create Date: 2026-10-17 01:10:00
+"""
+from alembic import op
+
+
+revision = 'c4e9d17a3b82'
+down_revision = '8b52e0c4a1f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_all already adds it on a new database
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS daily_bonus_date DATE")
+
+
+def downgrade():
+    op.execute("ALTER TABLE users DROP COLUMN IF EXISTS daily_bonus_date")
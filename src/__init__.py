@@ -1,7 +1,7 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
 from .auth.routes import auth_router
-from .auth.utils import get_current_user_websocket
+from .auth.dependencies import RoleChecker
+from .auth.utils import get_current_user_websocket, password_hasher
 from .daily_challenge.routes import daily_challenge_router
 from .tasks.routes import task_router
 from .friend.routes import friend_router
@@ -10,24 +10,40 @@ from .achievements.routes import achievement_router
 from .middleware import register_middleware
 from contextlib import asynccontextmanager
 from src.db.main import init_db
-from src.db.mongo import initialize_blocklist
-from .manager import WebSocketManager
-from src.db.main import get_session
-
-manager = WebSocketManager()
+from src.revocation import revocation_store
+from src.live_session import live_session_store
+from src.chat import chat_history
+from src.outbox import outbox_relay
+from src.cache import token_cache, user_cache, user_profile_cache
+from .manager import manager
+from .codec import negotiate_codec
+from src.db.main import async_session
 
 @asynccontextmanager 
 async def life_span(app:FastAPI):
     print(f"Server is starting...")
     await init_db()
-    await initialize_blocklist()
+    await revocation_store.start()
+    await live_session_store.start()
+    await chat_history.start()
+    await outbox_relay.start()
+    await manager.start()
     yield
+    await manager.stop()
+    await outbox_relay.stop()
+    await chat_history.stop()
+    await live_session_store.stop()
+    await revocation_store.stop()
+    password_hasher.shutdown()
     print(f"Server has been stopped")
 
 version = "v1"
 
 version_prefix =f"/api/{version}"
 
+# Operational metrics expose node internals, so only admins may read them
+admin_checker = RoleChecker(["admin"])
+
 
 app = FastAPI(
     title = "Hudddle Web Service",
@@ -54,29 +70,58 @@ app.include_router(achievement_router, prefix=f"/api/{version}/achievements", ta
 async def root():
     return {"message": "Hudddle.io Backend services [Let's make remote work fun]. To view the documentation goto ==> /api/v1/docs"}
 
+@app.get(f"{version_prefix}/ws/metrics", dependencies=[Depends(admin_checker)])
+async def websocket_metrics():
+    return manager.metrics()
+
+@app.get(f"{version_prefix}/auth/hashing/metrics", dependencies=[Depends(admin_checker)])
+async def password_hashing_metrics():
+    return password_hasher.metrics()
+
+@app.get(f"{version_prefix}/events/metrics", dependencies=[Depends(admin_checker)])
+async def task_event_metrics():
+    return outbox_relay.metrics()
+
+@app.get(f"{version_prefix}/cache/metrics", dependencies=[Depends(admin_checker)])
+async def cache_metrics():
+    return {
+        'tokens': token_cache.stats(),
+        'users': user_cache.stats(),
+        'user_profiles': user_profile_cache.stats(),
+        'revocation': revocation_store.metrics(),
+    }
+
 @app.websocket("/api/v1/workrooms/{workroom_id}/ws")
 async def workroom_websocket_endpoint(
     websocket: WebSocket,
     workroom_id: str,
-    token: str = Query(...),
-    session: AsyncSession = Depends(get_session)
+    token: str = Query(...)
 ):
-    # Authenticate user
-    user = await get_current_user_websocket(websocket, token, session)
-    if not user:
-        return
-        
+    # Sessions are opened per unit of work so an idle socket never pins a pooled connection
+    async with async_session() as session:
+        # Authenticate user
+        user = await get_current_user_websocket(websocket, token, session)
+        if not user:
+            return
+        user_id = str(user.id)
+
     try:
         # Connect to workroom
-        await manager.connect(websocket, workroom_id, str(user.id), session)
+        codec = negotiate_codec(websocket)
+        async with async_session() as session:
+            if not await manager.connect(websocket, workroom_id, user_id, session, codec):
+                return
         
         # Handle messages
         while True:
-            data = await websocket.receive_json()
-            await manager.handle_message(data, workroom_id, str(user.id), session)
+            data = await manager.receive_message(websocket, workroom_id, user_id, codec)
+            async with async_session() as session:
+                await manager.handle_message(data, workroom_id, user_id, session)
             
     except WebSocketDisconnect:
-        await manager.disconnect(websocket, workroom_id, str(user.id), session)
+        async with async_session() as session:
+            await manager.disconnect(websocket, workroom_id, user_id, session)
     except Exception as e:
         print(f"WebSocket error: {e}")
-        await manager.disconnect(websocket, workroom_id, str(user.id), session)
\ No newline at end of file
+        async with async_session() as session:
+            await manager.disconnect(websocket, workroom_id, user_id, session)
@@ -7,7 +7,6 @@ from src.db.models import Badge, UserBadgeLink, UserLevel, UserStreak, User
 from .schema import BadgeSchema
 from src.db.main import get_session
 from src.auth.dependencies import get_current_user
-from .service import update_user_levels
 
 
 achievement_router = APIRouter()
@@ -37,7 +36,6 @@ async def get_user_levels(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
-    await update_user_levels(current_user.id, session)  # Update levels before returning them.
     result = await session.execute(select(UserLevel).where(UserLevel.user_id == current_user.id))
     user_levels = result.scalars().all()
     return [
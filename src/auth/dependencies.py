@@ -4,33 +4,55 @@ from fastapi.exceptions import HTTPException
 from fastapi.security.http import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from src.db.mongo import token_in_blocklist
+from src.revocation import revocation_store
 from src.db.main import get_session
 from src.db.models import User
-from .utils import decode_token
-from .service import UserService
+from src.cache import TTLCache, token_cache
+from src.config import Config
+from .utils import decode_token, token_digest
+from .service import TokenGenerationService, UserService
 from typing import Any, List, Union
 from jwt.exceptions import ExpiredSignatureError, DecodeError
+import time
 
 
 user_service = UserService()
+token_generations = TokenGenerationService()
 
 
 class TokenBearer(HTTPBearer):
-    def __init__(self, auto_error=True):
+    def __init__(self, auto_error=True, cache: Optional[TTLCache] = token_cache):
         super().__init__(auto_error=auto_error)
+        self.cache = cache if Config.TOKEN_CACHE_ENABLED else None
 
     async def __call__(self, request: Request) -> Union[HTTPAuthorizationCredentials, None]:
         creds = await super().__call__(request)
         token = creds.credentials
-        token_data = self.token_valid(token)
+        digest = token_digest(token)
+        request.state.token_digest = digest
+        token_data = self.claims(token, digest)
         if token_data is None:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or Expired Token")
-        if await token_in_blocklist(token_data["jti"]):
+        if await revocation_store.is_revoked(token_data["jti"]):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or Expired Token")
+        if token_data.get("gen", 0) < await token_generations.current(token_data["user"]["user_uid"]):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
         self.verify_token_data(token_data)
         return token_data
 
+    def claims(self, token: str, digest: Optional[bytes] = None) -> Optional[dict]:
+        """Verified claims for a token, decoded once and then served from the cache"""
+        if self.cache is None:
+            return self.token_valid(token)
+
+        digest = digest or token_digest(token)
+        token_data = self.cache.get(digest)
+        if token_data is None:
+            token_data = self.token_valid(token)
+            # Never serve claims past the token's own expiry
+            self.cache.set(digest, token_data, ttl=token_data["exp"] - time.time())
+        return token_data
+
     def token_valid(self, token: str) -> Optional[dict]:
         try:
             token_data = decode_token(token)
@@ -58,13 +80,22 @@ class RefreshTokenBearer(TokenBearer):
         if token_data and not token_data["refresh"]:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Please provide a valid refresh token")
 
+def forget_token(request: Request) -> None:
+    """Drop the request's bearer token from the decoded-token cache, e.g. on logout"""
+    digest = getattr(request.state, "token_digest", None)
+    if digest is not None:
+        token_cache.invalidate(digest)
+
+
 async def get_current_user(
     token_details: dict = Depends(AccessTokenBearer()),
     session: AsyncSession = Depends(get_session),
 ):
-    user_email = token_details["user"]["email"]
+    user_uid = token_details["user"]["user_uid"]
 
-    user = await user_service.get_user_by_email(user_email, session)
+    # Resolved once per request (FastAPI caches the dependency), and across requests
+    # through the user cache
+    user = await user_service.get_user_by_id(user_uid, session)
 
     return user
 
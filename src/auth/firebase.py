@@ -0,0 +1,138 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from cryptography import x509
+from src.config import Config
+import asyncio
+import logging
+import re
+import time
+import httpx
+import jwt
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+# Used when Google sends no usable Cache-Control max-age
+DEFAULT_KEYS_TTL = 3600
+# Unknown key ids trigger an early refetch at most this often, so junk tokens can't hammer Google
+MIN_REFRESH_INTERVAL = 60
+
+_firebase_app = None
+
+
+def firebase_app():
+    """The Firebase Admin app, initialized from the credential file on first use"""
+    global _firebase_app
+    if _firebase_app is None:
+        import firebase_admin
+        from firebase_admin import credentials
+
+        _firebase_app = firebase_admin.initialize_app(credentials.Certificate(Config.FIREBASE_CREDENTIALS_FILE))
+    return _firebase_app
+
+
+class InvalidFirebaseToken(Exception):
+    pass
+
+
+async def fetch_google_certificates(url: str = GOOGLE_CERTS_URL) -> Tuple[Dict[str, str], float]:
+    """Google's current signing certificates by key id, and how long they may be cached"""
+    async with httpx.AsyncClient(timeout=10) as client:
+        response = await client.get(url)
+        response.raise_for_status()
+
+    max_age = re.search(r"max-age=(\d+)", response.headers.get("cache-control", ""))
+    return response.json(), float(max_age.group(1)) if max_age else DEFAULT_KEYS_TTL
+
+
+class FirebaseTokenVerifier:
+    """Verifies Firebase ID tokens locally against Google's cached signing keys.
+
+    The keys are refetched once their Cache-Control lifetime runs out, or early when a
+    token names a key id we have not seen (Google rotated keys). Signature checks run in
+    a worker thread. Pass `fetch_certificates` and `project_id` to verify tokens signed
+    with locally generated keys.
+    """
+
+    def __init__(
+        self,
+        project_id: Optional[str] = None,
+        fetch_certificates: Callable[[], Awaitable[Tuple[Dict[str, str], float]]] = fetch_google_certificates,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._project_id = project_id
+        self.fetch_certificates = fetch_certificates
+        self.clock = clock
+        self.keys: Dict[str, Any] = {}
+        self.keys_expire_at = 0.0
+        self.fetched_at = float("-inf")
+        self.lock = asyncio.Lock()
+
+    @property
+    def project_id(self) -> str:
+        if self._project_id is None:
+            self._project_id = Config.FIREBASE_PROJECT_ID or firebase_app().project_id
+        return self._project_id
+
+    def _keys_fresh(self, force: bool) -> bool:
+        if force:
+            return self.clock() - self.fetched_at < MIN_REFRESH_INTERVAL
+        return bool(self.keys) and self.clock() < self.keys_expire_at
+
+    async def signing_keys(self, force: bool = False) -> Dict[str, Any]:
+        if self._keys_fresh(force):
+            return self.keys
+
+        async with self.lock:
+            # Another request may have refreshed them while we waited
+            if self._keys_fresh(force):
+                return self.keys
+            certificates, ttl = await self.fetch_certificates()
+            self.keys = {
+                key_id: x509.load_pem_x509_certificate(certificate.encode()).public_key()
+                for key_id, certificate in certificates.items()
+            }
+            self.fetched_at = self.clock()
+            self.keys_expire_at = self.fetched_at + ttl
+            logging.info(f"Loaded {len(self.keys)} Firebase signing keys for {ttl:.0f}s")
+            return self.keys
+
+    async def verify(self, id_token: str) -> Dict[str, Any]:
+        """The token's claims, with `uid` set as firebase_admin does; raises InvalidFirebaseToken"""
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except jwt.PyJWTError as e:
+            raise InvalidFirebaseToken(f"Malformed ID token: {e}")
+        if header.get("alg") != "RS256":
+            raise InvalidFirebaseToken("ID token must be signed with RS256")
+
+        key_id = header.get("kid")
+        keys = await self.signing_keys()
+        if key_id not in keys:
+            keys = await self.signing_keys(force=True)
+        if key_id not in keys:
+            raise InvalidFirebaseToken("ID token was signed with an unknown key")
+
+        project_id = self.project_id
+        return await asyncio.to_thread(self._decode, id_token, keys[key_id], project_id)
+
+    def _decode(self, id_token: str, key: Any, project_id: str) -> Dict[str, Any]:
+        try:
+            claims = jwt.decode(
+                id_token,
+                key=key,
+                algorithms=["RS256"],
+                audience=project_id,
+                issuer=f"https://securetoken.google.com/{project_id}",
+                options={"require": ["exp", "iat", "aud", "iss", "sub"]},
+            )
+        except jwt.PyJWTError as e:
+            raise InvalidFirebaseToken(str(e))
+
+        subject = claims.get("sub")
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise InvalidFirebaseToken("ID token has an invalid subject")
+        if claims.get("auth_time", 0) > self.clock():
+            raise InvalidFirebaseToken("ID token has an auth_time in the future")
+        claims["uid"] = subject
+        return claims
+
+
+firebase_verifier = FirebaseTokenVerifier()
@@ -1,11 +1,11 @@
-from src.mail import create_message, mail
-import firebase_admin
-from firebase_admin import auth, credentials
-from fastapi import APIRouter, Depends, status, HTTPException, BackgroundTasks
+from src.mail import create_message
+from src.celery_tasks import enqueue_email
+from fastapi import APIRouter, Depends, Request, status, HTTPException
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta, datetime
 import logging
+import time
 
 # Import SQLAlchemy models and utilities
 from src.db.models import User
@@ -17,16 +17,13 @@ from .schema import (
 from .service import UserService
 from .utils import (
     create_access_tokens, create_url_safe_token, 
-    decode_url_safe_token, verify_password, generate_password_hash
+    decode_url_safe_token, verify_and_update_password, generate_password_hash
 )
-from .dependencies import RefreshTokenBearer, AccessTokenBearer, get_current_user, RoleChecker
-from src.db.mongo import add_jti_to_blocklist
+from .dependencies import RefreshTokenBearer, AccessTokenBearer, get_current_user, RoleChecker, forget_token, token_generations
+from .firebase import InvalidFirebaseToken, firebase_verifier
+from src.revocation import revocation_store
 from src.config import Config
 
-# Initialize Firebase Admin SDK
-cred = credentials.Certificate("hudddle-project-firebase.json")
-firebase_admin.initialize_app(cred)
-
 # Router and service setup
 auth_router = APIRouter()
 user_service = UserService()
@@ -35,14 +32,11 @@ role_checker = RoleChecker(["admin", "user"])
 # Constants
 REFRESH_TOKEN_EXPIRY = 2
 
-async def send_email(message):
-    await mail.send_message(message)
-
 
 @auth_router.post("/firebase_login", status_code=status.HTTP_200_OK)
 async def firebase_login(id_token: str, session: AsyncSession = Depends(get_session)):
     try:
-        decoded_token = auth.verify_id_token(id_token)
+        decoded_token = await firebase_verifier.verify(id_token)
         uid = decoded_token['uid']
         email = decoded_token['email']
         name = decoded_token.get('name')
@@ -61,13 +55,16 @@ async def firebase_login(id_token: str, session: AsyncSession = Depends(get_sess
             }
             user = await user_service.create_user(User(**new_user_data), session)
 
+        generation = await token_generations.current(user.id)
         access_token = create_access_tokens(
-            user_data={"email": user.email, "user_uid": str(user.id), "role": user.role}
+            user_data={"email": user.email, "user_uid": str(user.id), "role": user.role},
+            generation=generation,
         )
         refresh_token = create_access_tokens(
             user_data={"email": user.email, "user_uid": str(user.id)},
             refresh=True,
             expiry=timedelta(days=REFRESH_TOKEN_EXPIRY),
+            generation=generation,
         )
         return JSONResponse(
             content={
@@ -77,7 +74,7 @@ async def firebase_login(id_token: str, session: AsyncSession = Depends(get_sess
                 "user": {"email": user.email, "uid": str(user.id), "username": user.username},
             }
         )
-    except auth.InvalidIdTokenError:
+    except InvalidFirebaseToken:
         raise HTTPException(status_code=401, detail="Invalid ID token")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Firebase login failed: {e}")
@@ -88,7 +85,6 @@ async def firebase_login(id_token: str, session: AsyncSession = Depends(get_sess
 @auth_router.post("/signup", status_code=status.HTTP_201_CREATED)
 async def create_user_account(
     user_data: UserCreateModel, 
-    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_session)
 ):
     try:
@@ -112,12 +108,14 @@ async def create_user_account(
         subject = "Verify Your email"
         message = create_message(recipients=emails, subject=subject, body=html)
 
-        background_tasks.add_task(send_email, message)
+        await enqueue_email(message)
 
         return {
             "message": "Account Created! Check email to verify your account",
             "user": new_user,
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -134,15 +132,21 @@ async def login_user(
 
         user = await user_service.get_user_by_email(email, session)
         if user is not None:
-            password_valid = verify_password(password, user.password_hash)
+            password_valid, new_hash = await verify_and_update_password(password, user.password_hash)
 
             if password_valid:
+                if new_hash:
+                    # The configured bcrypt cost changed since this hash was made
+                    await user_service.update_user(user, {"password_hash": new_hash}, session)
+
+                generation = await token_generations.current(user.id)
                 access_token = create_access_tokens(
                     user_data={
                         "email": user.email,
                         "user_uid": str(user.id),
                         "role": user.role,
-                    }
+                    },
+                    generation=generation,
                 )
 
                 refresh_token = create_access_tokens(
@@ -152,6 +156,7 @@ async def login_user(
                     },
                     refresh=True,
                     expiry=timedelta(days=REFRESH_TOKEN_EXPIRY),
+                    generation=generation,
                 )
                 return JSONResponse(
                     content={
@@ -169,6 +174,8 @@ async def login_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid Email or Password",
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -210,7 +217,9 @@ async def get_new_access_token(token_details: dict = Depends(RefreshTokenBearer(
     try:
         expiry_timestamp = token_details['exp']
         if datetime.fromtimestamp(expiry_timestamp) > datetime.now():
-            new_access_token = create_access_tokens(user_data=token_details['user'])
+            new_access_token = create_access_tokens(
+                user_data=token_details['user'], generation=token_details.get('gen', 0)
+            )
             return JSONResponse(content={"access_token": new_access_token})
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or Expired Token"
@@ -222,7 +231,8 @@ async def get_new_access_token(token_details: dict = Depends(RefreshTokenBearer(
 
 
 @auth_router.get("/logout")
-async def revoke_token(token_details: dict = Depends(AccessTokenBearer()), 
+async def revoke_token(request: Request,
+                       token_details: dict = Depends(AccessTokenBearer()), 
                        session: AsyncSession = Depends(get_session)):
     try:
         jti = token_details.get("jti")
@@ -230,7 +240,9 @@ async def revoke_token(token_details: dict = Depends(AccessTokenBearer()),
         if not jti:
             raise HTTPException(status_code=400, detail="JTI not found in token")
         
-        await add_jti_to_blocklist(jti)
+        # Only this token: revoked until it would have expired anyway. /logout-all bumps the generation
+        await revocation_store.revoke(jti, token_details["exp"] - time.time())
+        forget_token(request)
 
         return JSONResponse(
             content={"message": "Logged out Successfully"},
@@ -246,8 +258,19 @@ async def revoke_token(token_details: dict = Depends(AccessTokenBearer()),
         await session.close()
 
 
+@auth_router.post("/logout-all")
+async def revoke_all_tokens(request: Request, token_details: dict = Depends(AccessTokenBearer())):
+    """Log the user out of every device by moving them to a new token generation"""
+    await token_generations.bump(token_details["user"]["user_uid"])
+    forget_token(request)
+    return JSONResponse(
+        content={"message": "Logged out of all sessions"},
+        status_code=status.HTTP_200_OK,
+    )
+
+
 @auth_router.get("/me")
-async def get_current_user(
+async def get_me(
     user: User = Depends(get_current_user),
     _: bool = Depends(role_checker),
     session: AsyncSession = Depends(get_session),
@@ -262,7 +285,7 @@ async def get_current_user(
 
 
 @auth_router.post("/password-reset-request")
-async def password_reset_request(email_data: PasswordResetRequestModel, background_tasks: BackgroundTasks):
+async def password_reset_request(email_data: PasswordResetRequestModel):
     email = email_data.email
 
     token = create_url_safe_token({"email": email})
@@ -277,7 +300,7 @@ async def password_reset_request(email_data: PasswordResetRequestModel, backgrou
 
     message = create_message(recipients=[email], subject=subject, body=html_message)
 
-    background_tasks.add_task(send_email, message)
+    await enqueue_email(message)
 
     return JSONResponse(
         content={
@@ -310,8 +333,10 @@ async def reset_account_password(
             if not user:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-            passwd_hash = generate_password_hash(new_password)
+            passwd_hash = await generate_password_hash(new_password)
             await user_service.update_user(user, {"password_hash": passwd_hash}, session)
+            # Sessions opened with the old password end with it
+            await token_generations.bump(user.id)
 
             return JSONResponse(
                 content={"message": "Password reset Successfully"},
@@ -329,7 +354,7 @@ async def reset_account_password(
 
 
 @auth_router.post("/send_mail")
-async def send_mail(emails: EmailModel, background_tasks: BackgroundTasks):
+async def send_mail(emails: EmailModel):
     emails = emails.addresses
 
     html = "<h1>Welcome to the app</h1>"
@@ -337,7 +362,7 @@ async def send_mail(emails: EmailModel, background_tasks: BackgroundTasks):
 
     message = create_message(recipients=emails, subject=subject, body=html)
 
-    background_tasks.add_task(send_email, message)
+    await enqueue_email(message)
 
     return {"message": "Email sent successfully"}
 
@@ -1,11 +1,19 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, inspect
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 from fastapi import HTTPException, status
-from src.db.models import User
-from typing import Any
+from src.db.models import User, UserTokenGeneration
+from src.db.main import async_session
+from typing import Any, Optional
 from .schema import UserCreateModel
 from .utils import generate_password_hash
+from src.cache import token_generation_cache, user_cache
+from src.manager import manager
+import copy
 import logging
+import uuid
 from sqlalchemy.exc import IntegrityError
 
 class UserService:
@@ -22,6 +30,40 @@ class UserService:
             logging.error(f"Error getting user by Firebase UID: {e}")
             return None
 
+    async def get_user_by_id(self, user_id: str, session: AsyncSession) -> Optional[User]:
+        """Loads a user by primary key, served from the short-lived user cache when possible.
+
+        A cached user is rebuilt and attached to `session` without a query, so routes can
+        modify and commit it like any loaded row.
+        """
+        try:
+            user_id = uuid.UUID(str(user_id))
+        except ValueError:
+            return None
+
+        user = session.identity_map.get(identity_key(User, user_id))
+        if user is not None:
+            return user
+
+        columns = user_cache.get(str(user_id))
+        if columns is None:
+            user = await session.get(User, user_id)
+            if user is not None:
+                user_cache.set(str(user_id), {
+                    attribute.key: copy.deepcopy(getattr(user, attribute.key))
+                    for attribute in inspect(User).column_attrs
+                })
+            return user
+
+        user = User(**copy.deepcopy(columns))
+        make_transient_to_detached(user)
+        session.add(user)
+        return user
+
+    async def forget_user(self, user_id: Any):
+        """Drop cached copies of a user, on every node, after their row changed"""
+        await manager.forget_user(str(user_id))
+
     async def get_user_by_email(self, email: str, session: AsyncSession):
         try:
             # Use SQLAlchemy's select statement
@@ -45,7 +87,7 @@ class UserService:
         user_data_dict = user_data.model_dump()
         password = user_data_dict.pop("password")
         new_user = User(**user_data_dict)
-        new_user.password_hash = generate_password_hash(password)
+        new_user.password_hash = await generate_password_hash(password)
         new_user.role = "user"
         session.add(new_user)
         try:
@@ -65,6 +107,8 @@ class UserService:
                 setattr(user, key, value)
             await session.commit()
             await session.refresh(user)
+            # Neither the auth lookup nor profiles shown over WebSockets may outlive the update
+            await self.forget_user(user.id)
             return user
         except Exception as e:
             await session.rollback()
@@ -73,4 +117,32 @@ class UserService:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="An error occurred while updating the user."
             )
-            
\ No newline at end of file
+            
+
+
+class TokenGenerationService:
+    """Per-user token generations: bumping one invalidates every token issued before it"""
+
+    async def current(self, user_id: Any) -> int:
+        key = str(user_id)
+        generation = token_generation_cache.get(key)
+        if generation is None:
+            async with async_session() as session:
+                generation = await session.scalar(
+                    select(UserTokenGeneration.generation).where(UserTokenGeneration.user_id == uuid.UUID(key))
+                ) or 0
+            token_generation_cache.set(key, generation)
+        return generation
+
+    async def bump(self, user_id: Any) -> int:
+        """Move the user to a new generation, logging out every existing session"""
+        statement = insert(UserTokenGeneration).values(user_id=uuid.UUID(str(user_id)), generation=1)
+        statement = statement.on_conflict_do_update(
+            index_elements=[UserTokenGeneration.user_id],
+            set_={'generation': UserTokenGeneration.generation + 1}
+        ).returning(UserTokenGeneration.generation)
+        async with async_session() as session:
+            generation = await session.scalar(statement)
+            await session.commit()
+        token_generation_cache.set(str(user_id), generation)
+        return generation
@@ -1,37 +1,112 @@
 from itsdangerous import URLSafeTimedSerializer
 from sqlalchemy import select
-from fastapi import WebSocket, status
+from fastapi import WebSocket, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from src.config import Config
 from src.db.models import User
+import asyncio
+import hashlib
 import logging
 import jwt
+import time
 import uuid
 from jwt.exceptions import ExpiredSignatureError, DecodeError
 
 
 password_context = CryptContext(
-    schemes=["bcrypt"]
+    schemes=["bcrypt"],
+    bcrypt__rounds=Config.BCRYPT_ROUNDS
 )
 
+
+class PasswordHasher:
+    """Runs bcrypt on a small thread pool so hashing never blocks the event loop.
+
+    bcrypt releases the GIL while it works, so the threads hash in parallel. At most
+    `workers` hashes run at once; later callers queue, and that wait is recorded. Once
+    `max_queue` callers are waiting, new ones are turned away with a 503.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        self.hash_time_total = 0.0
+
+    async def run(self, fn: Callable, *args) -> Any:
+        if self.in_flight - self.workers >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in requests, please try again shortly",
+            )
+
+        queued_at = time.perf_counter()
+
+        def timed() -> Tuple[Any, float, float]:
+            started_at = time.perf_counter()
+            result = fn(*args)
+            return result, started_at - queued_at, time.perf_counter() - started_at
+
+        self.in_flight += 1
+        try:
+            result, queue_time, hash_time = await asyncio.get_running_loop().run_in_executor(self.executor, timed)
+        finally:
+            self.in_flight -= 1
+
+        self.completed += 1
+        self.queue_time_total += queue_time
+        self.queue_time_max = max(self.queue_time_max, queue_time)
+        self.hash_time_total += hash_time
+        return result
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'rounds': Config.BCRYPT_ROUNDS,
+            'in_flight': self.in_flight,
+            'queued': max(0, self.in_flight - self.workers),
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'queue_time_avg_ms': self.queue_time_total / self.completed * 1000 if self.completed else 0.0,
+            'queue_time_max_ms': self.queue_time_max * 1000,
+            'hash_time_avg_ms': self.hash_time_total / self.completed * 1000 if self.completed else 0.0,
+        }
+
+
+password_hasher = PasswordHasher(Config.PASSWORD_HASH_WORKERS, Config.PASSWORD_HASH_MAX_QUEUE)
+
 serializer = URLSafeTimedSerializer(
     secret_key=Config.JWT_SECRET_KEY, salt="email-verification"
 )
 
 ACCESS_TOKEN_EXPIRY = 360000
 
-def generate_password_hash(password: str) -> str:
-    hash = password_context.hash(password)
+async def generate_password_hash(password: str) -> str:
+    hash = await password_hasher.run(password_context.hash, password)
     
     return hash
 
-def verify_password(password: str, hash: str) -> bool:
-    return password_context.verify(password, hash)
+async def verify_password(password: str, hash: str) -> bool:
+    return await password_hasher.run(password_context.verify, password, hash)
 
-def create_access_tokens(user_data: dict, expiry: timedelta = None, refresh: bool= False):
+async def verify_and_update_password(password: str, hash: str) -> Tuple[bool, Optional[str]]:
+    """Check a password; also returns a new hash if the stored one predates the current cost"""
+    return await password_hasher.run(password_context.verify_and_update, password, hash)
+
+def create_access_tokens(user_data: dict, expiry: timedelta = None, refresh: bool= False, generation: int = 0):
     payload = {}
     payload["user"] = user_data
     payload["exp"] = datetime.now() + (
@@ -39,6 +114,8 @@ def create_access_tokens(user_data: dict, expiry: timedelta = None, refresh: boo
         )
     payload["jti"] = str(uuid.uuid4())
     payload["refresh"] = refresh
+    # Tokens from an older generation than the user's current one are rejected
+    payload["gen"] = generation
     
     token = jwt.encode(
         payload= payload,
@@ -65,6 +142,10 @@ def decode_token(token: str) -> dict:
         logging.exception(f"Other JWT error: {e}")
         return None
     
+def token_digest(token: str) -> bytes:
+    """Cache key for a raw token, so tokens themselves are never held as keys"""
+    return hashlib.sha256(token.encode()).digest()
+
 def create_url_safe_token(data: dict):
 
     token = serializer.dumps(data)
@@ -99,6 +180,18 @@ async def get_current_user_websocket(
             credentials_exception = "Invalid token - user ID not found"
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return None
+
+        # The same revocation checks TokenBearer applies to HTTP requests
+        from src.revocation import revocation_store
+        from .dependencies import token_generations
+        if await revocation_store.is_revoked(payload.get("jti")):
+            credentials_exception = "Token has been revoked"
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return None
+        if payload.get("gen", 0) < await token_generations.current(user_id):
+            credentials_exception = "Token has been revoked"
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return None
             
         # Verify user exists
         result = await session.execute(select(User).where(User.id == user_id))
@@ -0,0 +1,240 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from collections import defaultdict
+from redis import asyncio as aioredis
+from src.config import Config
+import asyncio
+import logging
+import json
+import time
+
+# Called with (channel, envelope) for every message received on a subscribed channel
+MessageHandler = Callable[[str, dict], Awaitable[None]]
+
+
+# Every node subscribes to this one, for events that are not about a single workroom
+NODES_CHANNEL = "nodes"
+
+
+def workroom_channel(workroom_id: str) -> str:
+    return f"workroom:{workroom_id}"
+
+
+class Backplane:
+    """Pub/sub transport that carries workroom events between server processes"""
+
+    async def start(self, handler: MessageHandler):
+        raise NotImplementedError("Please Override this method in child classes")
+
+    async def stop(self):
+        raise NotImplementedError("Please Override this method in child classes")
+
+    async def publish(self, channel: str, envelope: dict):
+        raise NotImplementedError("Please Override this method in child classes")
+
+    async def subscribe(self, channel: str):
+        raise NotImplementedError("Please Override this method in child classes")
+
+    async def unsubscribe(self, channel: str):
+        raise NotImplementedError("Please Override this method in child classes")
+
+    async def subscriber_count(self, channel: str) -> Optional[int]:
+        """How many nodes are subscribed to the channel, None if that cannot be told"""
+        raise NotImplementedError("Please Override this method in child classes")
+
+    async def add_members(self, channel: str, members: List[str], ttl: float):
+        """Record members of the channel for every node to see; they lapse after ttl seconds
+        unless added again, so a node that dies does not leave them behind"""
+        raise NotImplementedError("Please Override this method in child classes")
+
+    async def remove_members(self, channel: str, members: List[str]):
+        raise NotImplementedError("Please Override this method in child classes")
+
+    async def members(self, channel: str) -> Optional[List[str]]:
+        """Unexpired members of the channel across all nodes, None if that cannot be told"""
+        raise NotImplementedError("Please Override this method in child classes")
+
+
+class InMemoryHub:
+    """Routes messages between in-memory backplanes living in the same process"""
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set["InMemoryBackplane"]] = defaultdict(set)
+        self.members: Dict[str, Dict[str, float]] = defaultdict(dict)  # channel: {member: expires_at}
+
+    async def publish(self, channel: str, envelope: dict):
+        for backplane in list(self.subscribers.get(channel, ())):
+            await backplane.deliver(channel, envelope)
+
+
+default_hub = InMemoryHub()
+
+
+class InMemoryBackplane(Backplane):
+    """Loopback backplane for a single process and for tests"""
+
+    def __init__(self, hub: InMemoryHub = default_hub):
+        self.hub = hub
+        self.handler: Optional[MessageHandler] = None
+        self.channels: Set[str] = set()
+
+    async def start(self, handler: MessageHandler):
+        self.handler = handler
+
+    async def stop(self):
+        for channel in list(self.channels):
+            await self.unsubscribe(channel)
+        self.handler = None
+
+    async def publish(self, channel: str, envelope: dict):
+        await self.hub.publish(channel, envelope)
+
+    async def subscribe(self, channel: str):
+        self.channels.add(channel)
+        self.hub.subscribers[channel].add(self)
+
+    async def unsubscribe(self, channel: str):
+        self.channels.discard(channel)
+        subscribers = self.hub.subscribers.get(channel)
+        if subscribers is not None:
+            subscribers.discard(self)
+            if not subscribers:
+                del self.hub.subscribers[channel]
+
+    async def subscriber_count(self, channel: str) -> Optional[int]:
+        return len(self.hub.subscribers.get(channel, ()))
+
+    async def add_members(self, channel: str, members: List[str], ttl: float):
+        expires_at = time.monotonic() + ttl
+        for member in members:
+            self.hub.members[channel][member] = expires_at
+
+    async def remove_members(self, channel: str, members: List[str]):
+        channel_members = self.hub.members.get(channel)
+        if channel_members is not None:
+            for member in members:
+                channel_members.pop(member, None)
+            if not channel_members:
+                del self.hub.members[channel]
+
+    async def members(self, channel: str) -> Optional[List[str]]:
+        now = time.monotonic()
+        return [member for member, expires_at in self.hub.members.get(channel, {}).items() if expires_at > now]
+
+    async def deliver(self, channel: str, envelope: dict):
+        if self.handler:
+            await self.handler(channel, envelope)
+
+
+class RedisBackplane(Backplane):
+    """Redis pub/sub backplane; each node only subscribes to rooms it has local sockets for"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.redis: Optional[aioredis.Redis] = None
+        self.pubsub = None
+        self.handler: Optional[MessageHandler] = None
+        self.reader_task: Optional[asyncio.Task] = None
+
+    def _client(self) -> aioredis.Redis:
+        if self.redis is None:
+            self.redis = aioredis.from_url(self.url)
+        return self.redis
+
+    async def start(self, handler: MessageHandler):
+        self.handler = handler
+        self.pubsub = self._client().pubsub(ignore_subscribe_messages=True)
+        self.reader_task = asyncio.create_task(self._reader())
+        logging.info("Redis backplane started")
+
+    async def stop(self):
+        if self.reader_task:
+            self.reader_task.cancel()
+            try:
+                await self.reader_task
+            except asyncio.CancelledError:
+                pass
+            self.reader_task = None
+        if self.pubsub is not None:
+            await self.pubsub.close()
+            self.pubsub = None
+        if self.redis is not None:
+            await self.redis.close()
+            self.redis = None
+
+    async def publish(self, channel: str, envelope: dict):
+        try:
+            await self._client().publish(channel, json.dumps(envelope))
+        except Exception as e:
+            logging.error(f"Error publishing to {channel}: {e}")
+
+    async def subscribe(self, channel: str):
+        if self.pubsub is not None:
+            await self.pubsub.subscribe(channel)
+
+    async def unsubscribe(self, channel: str):
+        if self.pubsub is not None:
+            await self.pubsub.unsubscribe(channel)
+
+    async def subscriber_count(self, channel: str) -> Optional[int]:
+        try:
+            counts = await self._client().pubsub_numsub(channel)
+        except Exception as e:
+            logging.error(f"Error counting subscribers of {channel}: {e}")
+            return None
+        return counts[0][1] if counts else 0
+
+    async def add_members(self, channel: str, members: List[str], ttl: float):
+        # A sorted set scored by expiry time; the key itself lapses once nobody refreshes it
+        key = f"members:{channel}"
+        try:
+            async with self._client().pipeline(transaction=False) as pipe:
+                pipe.zadd(key, {member: time.time() + ttl for member in members})
+                pipe.expire(key, int(ttl) + 1)
+                await pipe.execute()
+        except Exception as e:
+            logging.error(f"Error adding members to {channel}: {e}")
+
+    async def remove_members(self, channel: str, members: List[str]):
+        try:
+            await self._client().zrem(f"members:{channel}", *members)
+        except Exception as e:
+            logging.error(f"Error removing members from {channel}: {e}")
+
+    async def members(self, channel: str) -> Optional[List[str]]:
+        key = f"members:{channel}"
+        try:
+            async with self._client().pipeline(transaction=False) as pipe:
+                now = time.time()
+                pipe.zremrangebyscore(key, "-inf", now)
+                pipe.zrangebyscore(key, now, "+inf")
+                _, members = await pipe.execute()
+        except Exception as e:
+            logging.error(f"Error reading members of {channel}: {e}")
+            return None
+        return [member.decode() if isinstance(member, bytes) else member for member in members]
+
+    async def _reader(self):
+        while True:
+            try:
+                if not self.pubsub.subscribed:
+                    await asyncio.sleep(0.1)
+                    continue
+                message = await self.pubsub.get_message(timeout=1.0)
+                if message is None or self.handler is None:
+                    continue
+                channel = message["channel"]
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                await self.handler(channel, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error reading from Redis backplane: {e}")
+                await asyncio.sleep(1.0)
+
+
+def create_backplane() -> Backplane:
+    """Build the backplane selected by WS_BACKPLANE"""
+    if Config.WS_BACKPLANE == "redis":
+        return RedisBackplane(Config.WS_BACKPLANE_URL or Config.CELERY_BROKER_URL)
+    return InMemoryBackplane()
@@ -0,0 +1,82 @@
+# Per-recipient CPU cost of a workroom broadcast, before and after encode-once frames.
+# Run with (needs the usual .env so src.config loads): python -m src.benchmarks.broadcast_encoding
+
+from datetime import datetime
+from src.manager import ClientConnection, WebSocketManager
+from src.backplane import InMemoryBackplane, InMemoryHub
+from src.presence import PresenceRegistry
+import asyncio
+import json
+import time
+
+ROOM_SIZES = [10, 100, 1000]
+ROUNDS = 200
+
+MESSAGE = {
+    'type': 'chat',
+    'sender': {
+        'id': '5b0f3c8e-8f61-4c1e-9d0a-2a1f9b3f4c11',
+        'username': 'benchmark',
+        'avatar_url': 'https://example.com/avatars/benchmark.png',
+        'first_name': 'Bench',
+        'last_name': 'Mark'
+    },
+    'content': 'Has anyone looked at the deploy checklist for tonight? ' * 4,
+    'timestamp': datetime.utcnow().isoformat()
+}
+
+
+class NullWebSocket:
+    """Accepts frames without doing I/O; send_json serializes the way Starlette does"""
+
+    async def send_json(self, data):
+        json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+    async def send_text(self, data):
+        pass
+
+
+async def per_recipient_send_json(members: int) -> float:
+    """The old path: await send_json for every participant in turn"""
+    sockets = [NullWebSocket() for _ in range(members)]
+    start = time.process_time()
+    for _ in range(ROUNDS):
+        for websocket in sockets:
+            await websocket.send_json(MESSAGE)
+    return (time.process_time() - start) / (ROUNDS * members)
+
+
+async def encode_once(members: int) -> float:
+    """The new path: one encode per broadcast, the same frame queued on every connection"""
+    manager = WebSocketManager(
+        max_queue_size=ROUNDS + 1,
+        backplane=InMemoryBackplane(InMemoryHub()),
+        registry=PresenceRegistry()
+    )
+    for index in range(members):
+        connection = ClientConnection(NullWebSocket(), str(index), manager.max_queue_size, manager.overflow_policy)
+        manager.registry.add('bench', str(index), connection)
+        connection.start()
+
+    start = time.process_time()
+    for _ in range(ROUNDS):
+        await manager.broadcast('bench', MESSAGE)
+    # Let every sender task drain its queue
+    while any(connection.queue for _, connection in manager.registry.connections_in('bench')):
+        await asyncio.sleep(0)
+    elapsed = time.process_time() - start
+
+    await manager.stop()
+    return elapsed / (ROUNDS * members)
+
+
+async def main():
+    print(f"{'members':>8} {'send_json (us)':>16} {'encode once (us)':>18} {'speedup':>8}")
+    for members in ROOM_SIZES:
+        before = await per_recipient_send_json(members)
+        after = await encode_once(members)
+        print(f"{members:>8} {before * 1e6:>16.2f} {after * 1e6:>18.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+# Messages per second through a local SMTP sink: a new connection per message (what the
+# web process did through fastapi-mail) against MailDelivery's pooled connections.
+# Run with (needs the usual .env so src.config loads): python -m src.benchmarks.mail_throughput
+
+from src.mail import MailDelivery, SMTPPool, build_email
+import aiosmtplib
+import asyncio
+import time
+
+MESSAGES = 500
+SENDER = "Hudddle <noreply@example.com>"
+
+
+class SMTPSink(asyncio.Protocol):
+    """Accepts every message and throws it away; just enough SMTP for a client to deliver"""
+
+    received = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.buffer = b""
+        self.in_data = False
+        transport.write(b"220 sink ready\r\n")
+
+    def data_received(self, data: bytes):
+        self.buffer += data
+        while True:
+            if self.in_data:
+                end = self.buffer.find(b"\r\n.\r\n")
+                if end < 0:
+                    return
+                self.buffer = self.buffer[end + 5:]
+                self.in_data = False
+                SMTPSink.received += 1
+                self.transport.write(b"250 queued\r\n")
+                continue
+
+            line, separator, rest = self.buffer.partition(b"\r\n")
+            if not separator:
+                return
+            self.buffer = rest
+            command = line[:4].upper()
+            if command == b"EHLO":
+                self.transport.write(b"250-sink\r\n250 8BITMIME\r\n")
+            elif command == b"DATA":
+                self.in_data = True
+                self.transport.write(b"354 go ahead\r\n")
+            elif command == b"QUIT":
+                self.transport.write(b"221 bye\r\n")
+                self.transport.close()
+                return
+            else:
+                self.transport.write(b"250 ok\r\n")
+
+
+def payload(index: int) -> dict:
+    return {
+        "recipients": [f"member{index}@example.com"],
+        "subject": "Verify Your email",
+        "body": "<h1>Verify your Email</h1><p>Please click this <a href=\"https://example.com\">link</a></p>",
+        "subtype": "html",
+    }
+
+
+async def connection_per_message(port: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(index: int):
+        async with semaphore:
+            await aiosmtplib.send(build_email(payload(index), SENDER), hostname="127.0.0.1", port=port, start_tls=False)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(send(index) for index in range(MESSAGES)))
+    return MESSAGES / (time.perf_counter() - started_at)
+
+
+async def pooled(port: int, size: int) -> tuple:
+    pool = SMTPPool(size=size, hostname="127.0.0.1", port=port, username=None, password=None,
+                    start_tls=False, use_tls=False)
+    delivery = MailDelivery(pool, sender=SENDER)
+    started_at = time.perf_counter()
+    errors = await delivery.send_batch([payload(index) for index in range(MESSAGES)])
+    rate = MESSAGES / (time.perf_counter() - started_at)
+    await pool.close()
+    assert not any(errors), errors
+    return rate, pool.opened
+
+
+async def main():
+    server = await asyncio.get_running_loop().create_server(SMTPSink, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    print(f"{MESSAGES} messages to a local SMTP sink")
+    for size in (1, 4, 16):
+        print(f"{size:>2} at a time, new connection each  {await connection_per_message(port, size):8.0f} msgs/s")
+        rate, opened = await pooled(port, size)
+        print(f"{size:>2} at a time, pooled               {rate:8.0f} msgs/s   ({opened} connections opened)")
+    print(f"sink received {SMTPSink.received}")
+
+    server.close()
+    await server.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+# Revocation check latency for each store, single and batched, with 1% of checked tokens revoked.
+# Backends that can't be reached (Redis at REVOCATION_REDIS_URL / CELERY_BROKER_URL, Postgres
+# at DATABASE_URL, Mongo at MONGO_URI) are reported and skipped.
+# Run with (needs the usual .env so src.config loads): python -m src.benchmarks.revocation_check
+
+from src.revocation import MemoryRevocationStore, PostgresRevocationStore, RedisRevocationStore, RevocationStore
+from src.config import Config
+import asyncio
+import time
+import uuid
+
+CHECKS = 5000
+BATCH = 50
+REVOKED = 1000
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+BACKENDS = ["memory", "redis", "postgres", "mongo"]
+
+
+async def build(name: str) -> RevocationStore:
+    if name == "memory":
+        return MemoryRevocationStore()
+    if name == "redis":
+        return RedisRevocationStore(Config.REVOCATION_REDIS_URL or Config.CELERY_BROKER_URL, prefix="bench-revoked:")
+    if name == "postgres":
+        from src.db.main import init_db
+        await init_db()
+        return PostgresRevocationStore()
+    from src.db.mongo import MongoBlocklist
+    return MongoBlocklist()
+
+
+async def bench(store: RevocationStore):
+    revoked = [str(uuid.uuid4()) for _ in range(REVOKED)]
+    await store.revoke_many({jti: 300 for jti in revoked})
+    # Mostly live tokens, as in production
+    checked = [revoked[index % REVOKED] if index % 100 == 0 else str(uuid.uuid4()) for index in range(CHECKS)]
+
+    single = []
+    for jti in checked:
+        started_at = time.perf_counter()
+        await store.is_revoked(jti)
+        single.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    for index in range(0, CHECKS, BATCH):
+        await store.revoked(checked[index:index + BATCH])
+    batched = (time.perf_counter() - started_at) / CHECKS
+    return single, batched
+
+
+async def main():
+    print(f"{CHECKS} checks against {REVOKED} revoked tokens")
+    for name in BACKENDS:
+        try:
+            store = await build(name)
+            await store.start()
+        except Exception as e:
+            print(f"{name:<9} skipped ({e.__class__.__name__}: {e})")
+            continue
+        try:
+            single, batched = await bench(store)
+            print(
+                f"{name:<9} single p50 {percentile(single, 50) * 1e6:9.1f} us  p99 {percentile(single, 99) * 1e6:9.1f} us"
+                f"   batched {batched * 1e6:9.1f} us/token"
+            )
+        except Exception as e:
+            print(f"{name:<9} failed ({e.__class__.__name__}: {e})")
+        finally:
+            await store.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+# Importing, retitling and deleting tasks in a workroom: one request per task through the
+# existing handlers against a single POST /tasks/bulk, with SQL statements counted.
+# Needs Postgres at DATABASE_URL; writes a throwaway user and workroom and removes them after.
+# Run with (needs the usual .env so src.config loads): python -m src.benchmarks.task_bulk
+
+from sqlalchemy import event
+from src.db.main import async_session, engine, init_db
+from src.db.models import User, Workroom, WorkroomMemberLink
+from src.tasks.routes import bulk_tasks, create_task, delete_task, update_task
+from src.tasks.schema import TaskBulkRequest, TaskCreate, TaskUpdate
+import asyncio
+import time
+import uuid
+
+TASKS = 300
+
+statements = 0
+
+
+def count_statement(*args):
+    global statements
+    statements += 1
+
+
+async def timed(label: str, work):
+    global statements
+    statements = 0
+    started_at = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started_at
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms  {statements:6} statements")
+
+
+async def main():
+    await init_db()
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+
+    async with async_session() as session:
+        user = User(email=f"bench-{uuid.uuid4()}@example.com", password_hash="x")
+        session.add(user)
+        await session.flush()
+        workroom = Workroom(name="bench", created_by=user.id)
+        session.add(workroom)
+        await session.flush()
+        session.add(WorkroomMemberLink(workroom_id=workroom.id, user_id=user.id))
+        await session.commit()
+
+    async def attach(session):
+        # get_current_user hands handlers a user bound to the request's session, without a
+        # query when it comes from the user cache
+        return await session.merge(user, load=False)
+
+    def new_task(index: int) -> dict:
+        return {"title": f"Imported task {index}", "workroom_id": workroom.id, "category": "import"}
+
+    single_ids = []
+
+    async def one_by_one_create():
+        for index in range(TASKS):
+            async with async_session() as session:
+                task = await create_task(TaskCreate(**new_task(index)), session, await attach(session))
+                single_ids.append(task.id)
+
+    async def one_by_one_update():
+        for task_id in single_ids:
+            async with async_session() as session:
+                await update_task(task_id, TaskUpdate(title="Renamed"), session, await attach(session))
+
+    async def one_by_one_delete():
+        for task_id in single_ids:
+            async with async_session() as session:
+                await delete_task(task_id, session, await attach(session))
+
+    bulk_ids = []
+
+    async def bulk(operations: list):
+        async with async_session() as session:
+            response = await bulk_tasks(TaskBulkRequest(operations=operations), session, user)
+        assert all(item["status"] < 300 for item in response["results"]), response["results"][:3]
+        return response["results"]
+
+    async def bulk_create():
+        results = await bulk([{"op": "create", "task": new_task(index)} for index in range(TASKS)])
+        bulk_ids.extend(item["id"] for item in results)
+
+    async def bulk_update():
+        await bulk([{"op": "update", "id": task_id, "changes": {"title": "Renamed"}} for task_id in bulk_ids])
+
+    async def bulk_delete():
+        await bulk([{"op": "delete", "id": task_id} for task_id in bulk_ids])
+
+    print(f"{TASKS} tasks")
+    try:
+        await timed("create, one request each", one_by_one_create)
+        await timed("create, bulk", bulk_create)
+        await timed("update, one request each", one_by_one_update)
+        await timed("update, bulk", bulk_update)
+        await timed("delete, one request each", one_by_one_delete)
+        await timed("delete, bulk", bulk_delete)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+        async with async_session() as session:
+            await session.delete(await session.get(User, user.id))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+# Statements and time to complete one task through PUT /tasks/{id}, and then to apply its
+# task_completed event as the workers do, for users with a short and a long task history.
+# tests/test_task_completion.py holds both statement counts to their bounds. Needs Postgres
+# at DATABASE_URL; writes throwaway users and removes them after.
+# Run with (needs the usual .env so src.config loads): python -m src.benchmarks.task_completion
+
+from sqlalchemy import delete, event, exists, insert, select
+from src.db.main import async_session, engine, init_db
+from src.db.models import Badge, Task, TaskCollaborator, TaskEvent, TaskStatus, User, UserBadgeLink
+from src.achievements.service import TASK_MASTER_BADGE
+from src.tasks.routes import update_task
+from src.tasks.service import apply_task_event
+from src.tasks.schema import TaskUpdate
+import asyncio
+import time
+import uuid
+
+HISTORIES = (10, 1000, 10000)
+
+statements = 0
+created_badge = False
+
+
+def count_statement(*args):
+    global statements
+    statements += 1
+
+
+async def complete_one(history: int) -> tuple:
+    global statements
+    async with async_session() as session:
+        user = User(email=f"bench-{uuid.uuid4()}@example.com", password_hash="x")
+        friend = User(email=f"bench-{uuid.uuid4()}@example.com", password_hash="x")
+        session.add_all([user, friend])
+        await session.flush()
+        await session.execute(insert(Task), [
+            {"title": f"Done {index}", "created_by_id": user.id, "status": TaskStatus.COMPLETED, "deadline": None}
+            for index in range(history)
+        ])
+        task = Task(title="Finish me", created_by_id=user.id, deadline=None)
+        session.add(task)
+        await session.flush()
+        session.add(TaskCollaborator(task_id=task.id, user_id=friend.id, invited_by_id=user.id))
+        await session.commit()
+
+    results = []
+    try:
+        # The second completion hits the streak UPDATE path instead of the first-time INSERT
+        for attempt in range(2):
+            async with async_session() as session:
+                if attempt:
+                    task = Task(title="Finish me too", created_by_id=user.id, deadline=None)
+                    session.add(task)
+                    await session.commit()
+                current_user = await session.merge(user, load=False)
+                statements = 0
+                started_at = time.perf_counter()
+                await update_task(task.id, TaskUpdate(status=TaskStatus.COMPLETED), session, current_user)
+                request = (statements, time.perf_counter() - started_at)
+                event_id = (await session.execute(
+                    select(TaskEvent.id).where(TaskEvent.task_id == task.id)
+                )).scalar()
+
+            statements = 0
+            started_at = time.perf_counter()
+            assert await apply_task_event(str(event_id)) is not None
+            applied = (statements, time.perf_counter() - started_at)
+            assert await apply_task_event(str(event_id)) is None, "redelivered event was applied again"
+            results.append((request, applied))
+
+        async with async_session() as session:
+            xp = (await session.get(User, user.id)).xp
+            friend_xp = (await session.get(User, friend.id)).xp
+            has_badge = await session.scalar(select(exists().where(
+                UserBadgeLink.user_id == user.id,
+                UserBadgeLink.badge_id == Badge.id,
+                Badge.name == TASK_MASTER_BADGE,
+            )))
+        return results, xp, friend_xp, has_badge
+    finally:
+        async with async_session() as session:
+            # Core DELETE so the database's ON DELETE CASCADE clears tasks, streaks and badges
+            await session.execute(delete(User).where(User.id.in_([user.id, friend.id])))
+            await session.commit()
+
+
+async def setup():
+    """Make sure the badge completions award exists and start counting statements"""
+    global created_badge
+    await init_db()
+    async with async_session() as session:
+        if not await session.scalar(select(exists().where(Badge.name == TASK_MASTER_BADGE))):
+            session.add(Badge(name=TASK_MASTER_BADGE))
+            await session.commit()
+            created_badge = True
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+
+
+async def teardown():
+    event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+    if created_badge:
+        async with async_session() as session:
+            await session.execute(delete(Badge).where(Badge.name == TASK_MASTER_BADGE))
+            await session.commit()
+    await engine.dispose()
+
+
+async def main():
+    await setup()
+    try:
+        for history in HISTORIES:
+            results, xp, friend_xp, has_badge = await complete_one(history)
+            for attempt, (request, applied) in enumerate(results):
+                print(
+                    f"{history:>6} completed tasks, {'first' if attempt == 0 else 'second'} completion: "
+                    f"request {request[0]:2} statements {request[1] * 1000:6.1f} ms   "
+                    f"event {applied[0]:2} statements {applied[1] * 1000:6.1f} ms"
+                )
+            print(f"       user xp {xp}, collaborator xp {friend_xp}, badge {'awarded' if has_badge else 'missing'}")
+    finally:
+        await teardown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,42 @@
+# Per-request cost of turning a bearer token into verified claims, with the decoded-token
+# cache on and off. Mongo is not involved: the blocklist check is the same either way.
+# Run with (needs the usual .env so src.config loads): python -m src.benchmarks.token_auth
+
+from src.auth.dependencies import AccessTokenBearer
+from src.auth.utils import create_access_tokens
+from src.cache import TTLCache
+import time
+import uuid
+
+ROUNDS = 20000
+USERS = 200
+
+
+def tokens() -> list:
+    return [
+        create_access_tokens(user_data={
+            "email": f"member{index}@example.com",
+            "user_uid": str(uuid.uuid4()),
+            "role": "user",
+        })
+        for index in range(USERS)
+    ]
+
+
+def run(bearer: AccessTokenBearer, pool: list) -> float:
+    started_at = time.perf_counter()
+    for index in range(ROUNDS):
+        bearer.claims(pool[index % len(pool)])
+    return (time.perf_counter() - started_at) / ROUNDS
+
+
+if __name__ == "__main__":
+    pool = tokens()
+    uncached = AccessTokenBearer(cache=None)
+    cache = TTLCache(maxsize=USERS * 2, ttl=300)
+    cached = AccessTokenBearer(cache=cache)
+    cached.cache = cache  # regardless of TOKEN_CACHE_ENABLED
+
+    print(f"{ROUNDS} requests spread over {USERS} tokens")
+    print(f"cache off  {run(uncached, pool) * 1e6:8.2f} us/request")
+    print(f"cache on   {run(cached, pool) * 1e6:8.2f} us/request   {cache.stats()}")
@@ -0,0 +1,83 @@
+# Frame size and encode/decode time of the JSON and MessagePack workroom codecs.
+# Run with (needs the usual .env so src.config loads): python -m src.benchmarks.wire_encoding
+
+from datetime import datetime
+from src.codec import CODECS
+import base64
+import os
+import time
+import uuid
+
+ROUNDS = 5000
+
+
+def user(index: int) -> dict:
+    return {
+        'id': str(uuid.uuid4()),
+        'username': f'member{index}',
+        'avatar_url': f'https://example.com/avatars/{index}.png',
+        'first_name': 'Member',
+        'last_name': str(index)
+    }
+
+
+def chat_message() -> dict:
+    return {
+        'type': 'chat',
+        'id': str(uuid.uuid4()),
+        'sender': user(0),
+        'content': 'Pushing the release branch in ten minutes, shout if anything is still open.',
+        'timestamp': datetime.utcnow().isoformat()
+    }
+
+
+MESSAGES = {
+    'session_state': {
+        'type': 'session_state',
+        'is_active': True,
+        'screen_sharer': user(1),
+        'participants': [user(index) for index in range(50)],
+        'chat_history': [chat_message() for _ in range(20)]
+    },
+    'chat': chat_message(),
+    'webrtc_signal': {
+        'type': 'webrtc_signal',
+        'sender': str(uuid.uuid4()),
+        'signal': {
+            'type': 'offer',
+            # Real SDP offers are a few KB of mostly printable text
+            'sdp': 'v=0\r\n' + base64.b64encode(os.urandom(3000)).decode(),
+            'candidates': [
+                {'candidate': f'candidate:{index} 1 udp 2122260223 10.0.0.{index} 5{index:04d} typ host', 'sdpMid': '0', 'sdpMLineIndex': 0}
+                for index in range(8)
+            ]
+        }
+    }
+}
+
+
+def measure(codec, message: dict):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        frame = codec.encode(message)
+    encode_time = (time.perf_counter() - start) / ROUNDS
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        codec.decode(frame)
+    decode_time = (time.perf_counter() - start) / ROUNDS
+
+    size = len(frame.encode() if isinstance(frame, str) else frame)
+    return size, encode_time, decode_time
+
+
+def main():
+    print(f"{'message':>14} {'codec':>8} {'bytes':>8} {'encode (us)':>12} {'decode (us)':>12}")
+    for name, message in MESSAGES.items():
+        for codec in CODECS.values():
+            size, encode_time, decode_time = measure(codec, message)
+            print(f"{name:>14} {codec.name:>8} {size:>8} {encode_time * 1e6:>12.2f} {decode_time * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
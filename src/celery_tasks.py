@@ -1,8 +1,155 @@
-from src.celery_worker import celery_app
-from src.mail import mail
+from typing import List, Optional, Tuple
+from celery.signals import worker_process_shutdown
+from sqlalchemy import insert
+from src.celery_worker import celery_app, publish_task
+from src.config import Config
+from src.db.main import async_session
+from src.db.models import MailDeadLetter
+from src.mail import MailDelivery, SMTPPool, is_permanent_failure, message_payload
+from src.backplane import Backplane, RedisBackplane
+from src.outbox import notify_user
+from src.tasks.service import apply_task_event
+from fastapi_mail import MessageSchema
 import asyncio
+import logging
+import random
 
-@celery_app.task
-def send_email_async(message):
-    # Run the async email-sending function in the event loop
-    asyncio.run(mail.send_message(message))
\ No newline at end of file
+# One long-lived event loop per worker process, so pooled SMTP (and database) connections
+# survive from one task to the next instead of dying with a per-task asyncio.run
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_mail_delivery: Optional[MailDelivery] = None
+_backplane: Optional[Backplane] = None
+
+
+def run_in_worker_loop(coroutine):
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop.run_until_complete(coroutine)
+
+
+def mail_delivery() -> MailDelivery:
+    global _mail_delivery
+    if _mail_delivery is None:
+        _mail_delivery = MailDelivery(SMTPPool())
+    return _mail_delivery
+
+
+def worker_backplane() -> Optional[Backplane]:
+    """Where notifications for connected clients are published; only a Redis backplane
+    reaches the web processes"""
+    global _backplane
+    if _backplane is None and Config.WS_BACKPLANE == "redis":
+        _backplane = RedisBackplane(Config.WS_BACKPLANE_URL or Config.CELERY_BROKER_URL)
+    return _backplane
+
+
+@worker_process_shutdown.connect
+def close_worker_loop(**kwargs):
+    if _worker_loop is None or _worker_loop.is_closed():
+        return
+    if _mail_delivery is not None:
+        run_in_worker_loop(_mail_delivery.pool.close())
+    if _backplane is not None:
+        run_in_worker_loop(_backplane.stop())
+    _worker_loop.close()
+
+
+def retry_delay(retries: int) -> float:
+    """Exponential backoff with jitter so retried batches don't arrive together"""
+    delay = min(Config.MAIL_RETRY_BACKOFF_MAX_SECONDS, Config.MAIL_RETRY_BACKOFF_SECONDS * 2 ** retries)
+    return delay * random.uniform(0.5, 1.0)
+
+
+async def dead_letter(failures: List[Tuple[dict, BaseException]], attempts: int):
+    rows = [
+        {
+            "recipients": payload["recipients"],
+            "subject": payload["subject"],
+            "body": payload["body"],
+            "subtype": payload.get("subtype"),
+            "error": repr(error),
+            "attempts": attempts,
+        }
+        for payload, error in failures
+    ]
+    async with async_session() as session:
+        await session.execute(insert(MailDeadLetter), rows)
+        await session.commit()
+
+
+@celery_app.task(bind=True, max_retries=Config.MAIL_MAX_RETRIES, acks_late=True)
+def send_emails(self, payloads: List[dict]):
+    """Deliver a batch of messages; only the failed ones are retried, with backoff"""
+    errors = run_in_worker_loop(mail_delivery().send_batch(payloads))
+
+    retry, dead = [], []
+    for payload, error in zip(payloads, errors):
+        if error is None:
+            continue
+        if is_permanent_failure(error) or self.request.retries >= self.max_retries:
+            dead.append((payload, error))
+        else:
+            retry.append(payload)
+
+    if dead:
+        logging.error(f"Dead-lettering {len(dead)} emails: {dead[0][1]!r}")
+        try:
+            run_in_worker_loop(dead_letter(dead, attempts=self.request.retries + 1))
+        except Exception as e:
+            logging.error(f"Error storing dead-lettered emails: {e}")
+
+    sent = len(payloads) - len(retry) - len(dead)
+    if retry:
+        raise self.retry(args=[retry], countdown=retry_delay(self.request.retries))
+    return {"sent": sent, "dead_lettered": len(dead)}
+
+
+async def apply_task_events(event_ids: List[str]) -> List[str]:
+    """Apply each event in its own transaction; returns the ids that failed"""
+    failed = []
+    for event_id in event_ids:
+        try:
+            notification = await apply_task_event(event_id)
+        except Exception as e:
+            logging.error(f"Error applying task event {event_id}: {e}")
+            failed.append(event_id)
+            continue
+
+        backplane = worker_backplane()
+        if notification and backplane:
+            user_id, message = notification
+            try:
+                await notify_user(backplane, user_id, message)
+            except Exception as e:
+                # The rewards are committed; a missed notification is not worth a retry
+                logging.error(f"Error notifying user {user_id} of task event {event_id}: {e}")
+    return failed
+
+
+@celery_app.task(bind=True, max_retries=Config.TASK_EVENT_MAX_RETRIES, acks_late=True)
+def process_task_events(self, event_ids: List[str]):
+    """Apply gamification for a batch of task events; events already applied are skipped"""
+    failed = run_in_worker_loop(apply_task_events(event_ids))
+    if failed:
+        if self.request.retries >= self.max_retries:
+            logging.error(f"Giving up on {len(failed)} task events: {failed}")
+            return {"applied": len(event_ids) - len(failed), "failed": len(failed)}
+        raise self.retry(args=[failed], countdown=retry_delay(self.request.retries))
+    return {"applied": len(event_ids), "failed": 0}
+
+
+async def enqueue_emails(messages: List[MessageSchema]):
+    """Hand messages to the mail workers in batches instead of sending them in the web process"""
+    payloads = [message_payload(message) for message in messages]
+    for start in range(0, len(payloads), Config.MAIL_BATCH_SIZE):
+        batch = payloads[start:start + Config.MAIL_BATCH_SIZE]
+        try:
+            await publish_task(send_emails, batch)
+        except Exception as e:
+            logging.error(f"Error enqueueing {len(batch)} emails: {e}")
+
+
+async def enqueue_email(message: MessageSchema):
+    await enqueue_emails([message])
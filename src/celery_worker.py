@@ -1,5 +1,6 @@
 from celery import Celery
 from src.config import Config
+import asyncio
 
 celery_app = Celery(
     "worker",
@@ -9,4 +10,10 @@ celery_app = Celery(
 
 celery_app.conf.update(
     result_expires=3600,  # Task results expire after 1 hour
-)
\ No newline at end of file
+)
+
+
+async def publish_task(task, *args):
+    """Queue a Celery task from async code. Publishing talks to the broker synchronously, so
+    it runs off the event loop."""
+    await asyncio.to_thread(task.delay, *args)
@@ -0,0 +1,139 @@
+from typing import Awaitable, Callable, Deque, Dict, List, Set
+from collections import defaultdict, deque
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.db.main import async_session
+from src.db.models import WorkroomChatMessage
+from src.config import Config
+from datetime import datetime
+import asyncio
+import logging
+import uuid
+
+# Loads public profiles for many user ids at once, e.g. WebSocketManager.get_users_data
+UsersLoader = Callable[[List[str], AsyncSession], Awaitable[Dict[str, Dict]]]
+
+
+class ChatHistory:
+    """Ring buffer of recent chat per workroom plus a batched writer to Postgres"""
+
+    def __init__(
+        self,
+        buffer_size: int = Config.CHAT_HISTORY_BUFFER_SIZE,
+        flush_interval: float = Config.CHAT_FLUSH_INTERVAL_SECONDS,
+        batch_size: int = Config.CHAT_FLUSH_BATCH_SIZE,
+    ):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.buffers: Dict[str, Deque[dict]] = defaultdict(lambda: deque(maxlen=self.buffer_size))
+        self.loaded: Set[str] = set()
+        self.pending: List[dict] = []
+        self.batch_ready = asyncio.Event()
+        self.writer_task: asyncio.Task | None = None
+        self.written = 0
+
+    async def start(self):
+        self.writer_task = asyncio.create_task(self._writer())
+
+    async def stop(self):
+        if self.writer_task:
+            self.writer_task.cancel()
+            try:
+                await self.writer_task
+            except asyncio.CancelledError:
+                pass
+            self.writer_task = None
+        await self.flush()
+
+    def new_message(self, workroom_id: str, sender: dict, content: str) -> dict:
+        """Build a chat message, remember it, and queue it for persistence"""
+        created_at = datetime.utcnow()
+        message = {
+            'type': 'chat',
+            'id': str(uuid.uuid4()),
+            'sender': sender,
+            'content': content,
+            'timestamp': created_at.isoformat()
+        }
+        self.remember(workroom_id, message)
+        self.pending.append({
+            'id': uuid.UUID(message['id']),
+            'workroom_id': uuid.UUID(str(workroom_id)),
+            'sender_id': uuid.UUID(sender['id']) if sender.get('id') else None,
+            'content': content,
+            'created_at': created_at,
+        })
+        if len(self.pending) >= self.batch_size:
+            self.batch_ready.set()
+        return message
+
+    def remember(self, workroom_id: str, message: dict):
+        """Add a message to the replay buffer only, e.g. one persisted by another node"""
+        self.buffers[workroom_id].append(message)
+
+    def forget(self, workroom_id: str):
+        """Drop a workroom's buffer once nobody on this node is in it"""
+        self.buffers.pop(workroom_id, None)
+        self.loaded.discard(workroom_id)
+
+    async def recent(self, workroom_id: str, session: AsyncSession, load_users: UsersLoader) -> List[dict]:
+        """Last messages of a workroom, oldest first; read from Postgres once per buffer"""
+        if workroom_id not in self.loaded:
+            await self._load(workroom_id, session, load_users)
+        return list(self.buffers.get(workroom_id, ()))
+
+    async def _load(self, workroom_id: str, session: AsyncSession, load_users: UsersLoader):
+        result = await session.execute(
+            select(WorkroomChatMessage)
+            .where(WorkroomChatMessage.workroom_id == workroom_id)
+            .order_by(WorkroomChatMessage.created_at.desc(), WorkroomChatMessage.id.desc())
+            .limit(self.buffer_size)
+        )
+        rows = list(reversed(result.scalars().all()))
+        senders = await load_users([str(row.sender_id) for row in rows if row.sender_id], session)
+
+        buffered = self.buffers[workroom_id]
+        seen = {message['id'] for message in buffered}
+        history = [
+            {
+                'type': 'chat',
+                'id': str(row.id),
+                'sender': senders.get(str(row.sender_id), {}),
+                'content': row.content,
+                'timestamp': row.created_at.isoformat()
+            }
+            for row in rows if str(row.id) not in seen
+        ]
+        merged = sorted(history + list(buffered), key=lambda message: message['timestamp'])
+        buffered.clear()
+        buffered.extend(merged)
+        self.loaded.add(workroom_id)
+
+    async def flush(self):
+        """Insert every pending message in one multi-row INSERT"""
+        if not self.pending:
+            return
+
+        batch, self.pending = self.pending, []
+        try:
+            async with async_session() as session:
+                await session.execute(insert(WorkroomChatMessage), batch)
+                await session.commit()
+            self.written += len(batch)
+        except Exception as e:
+            logging.error(f"Error writing {len(batch)} chat messages: {e}")
+            # Keep them for the next attempt, but never grow without bound
+            self.pending = (batch + self.pending)[-self.batch_size * 10:]
+
+    async def _writer(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.batch_ready.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.batch_ready.clear()
+            await self.flush()
+
+
+chat_history = ChatHistory()
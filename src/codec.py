@@ -0,0 +1,117 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Optional
+from uuid import UUID
+from fastapi.websockets import WebSocket
+import msgpack
+import orjson
+
+# Naive datetimes in this codebase are UTC (datetime.utcnow), so they are tagged as such
+# and every datetime goes out in the same ISO-8601 "Z" form regardless of where it came from.
+JSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _msgpack_default(value: Any) -> Any:
+    # Same wire values as the JSON codec so clients can switch encodings transparently
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    return _default(value)
+
+
+def encode_json(message: dict) -> str:
+    """Serialize a WebSocket message to a JSON text frame"""
+    return orjson.dumps(message, default=_default, option=JSON_OPTIONS).decode()
+
+
+def decode_json(frame: str | bytes) -> Any:
+    """Parse a JSON text frame"""
+    return orjson.loads(frame)
+
+
+def encode_msgpack(message: dict) -> bytes:
+    """Serialize a WebSocket message to a MessagePack binary frame"""
+    return msgpack.packb(message, default=_msgpack_default, use_bin_type=True)
+
+
+def decode_msgpack(frame: bytes) -> Any:
+    """Parse a MessagePack binary frame"""
+    return msgpack.unpackb(frame, raw=False)
+
+
+class Codec:
+    def __init__(self, name: str, subprotocol: str, binary: bool, encode, decode):
+        self.name = name
+        self.subprotocol = subprotocol
+        self.binary = binary
+        self.encode = encode
+        self.decode = decode
+
+    async def send(self, websocket: WebSocket, frame: str | bytes):
+        if self.binary:
+            await websocket.send_bytes(frame)
+        else:
+            await websocket.send_text(frame)
+
+
+JSON_CODEC = Codec("json", "hudddle.json", False, encode_json, decode_json)
+MSGPACK_CODEC = Codec("msgpack", "hudddle.msgpack", True, encode_msgpack, decode_msgpack)
+
+CODECS: Dict[str, Codec] = {codec.name: codec for codec in (JSON_CODEC, MSGPACK_CODEC)}
+
+
+def negotiate_codec(websocket: WebSocket) -> Codec:
+    """Pick the codec from the offered subprotocols or ?encoding=, falling back to JSON"""
+    for subprotocol in websocket.scope.get("subprotocols", []):
+        for codec in CODECS.values():
+            if codec.subprotocol == subprotocol:
+                return codec
+    return CODECS.get(websocket.query_params.get("encoding", "json"), JSON_CODEC)
+
+
+def accepted_subprotocol(websocket: WebSocket, codec: Codec) -> Optional[str]:
+    """The subprotocol to echo on accept, only if the client offered it"""
+    if codec.subprotocol in websocket.scope.get("subprotocols", []):
+        return codec.subprotocol
+    return None
+
+
+class Frame:
+    """A message encoded at most once per codec, shared by every recipient"""
+
+    def __init__(self, message: Optional[dict] = None, encoded: Optional[Dict[str, str | bytes]] = None):
+        self._message = message
+        self.encoded: Dict[str, str | bytes] = encoded or {}
+
+    @classmethod
+    def from_json(cls, frame: str) -> "Frame":
+        return cls(encoded={JSON_CODEC.name: frame})
+
+    @property
+    def message(self) -> dict:
+        if self._message is None:
+            self._message = decode_json(self.encoded[JSON_CODEC.name])
+        return self._message
+
+    def encode(self, codec: Codec) -> str | bytes:
+        frame = self.encoded.get(codec.name)
+        if frame is None:
+            frame = codec.encode(self.message)
+            self.encoded[codec.name] = frame
+        return frame
@@ -1,11 +1,13 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from urllib.parse import quote_plus
+from typing import Optional
 
 class Settings(BaseSettings):
     MONGO_USERNAME: str
     MONGO_PASSWORD: str
     MONGO_CLUSTER: str
     MONGO_DB_NAME: str
+    MONGO_URL: Optional[str] = None  # e.g. mongodb://localhost:27017 for a local stand-in
     DATABASE_URL: str
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str
@@ -22,10 +24,68 @@ class Settings(BaseSettings):
     DOMAIN: str
     CELERY_BROKER_URL: str
     CELERY_RESULT_BACKEND: str
+    MAIL_POOL_SIZE: int = 4
+    MAIL_TIMEOUT_SECONDS: float = 30.0
+    MAIL_BATCH_SIZE: int = 50
+    MAIL_MAX_RETRIES: int = 5
+    MAIL_RETRY_BACKOFF_SECONDS: float = 10.0
+    MAIL_RETRY_BACKOFF_MAX_SECONDS: float = 600.0
+    FIREBASE_CREDENTIALS_FILE: str = "hudddle-project-firebase.json"
+    FIREBASE_PROJECT_ID: Optional[str] = None  # read from the credential file when unset
+
+    # WebSocket fan-out
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_OVERFLOW_POLICY: str = "drop_oldest"  # drop_oldest | coalesce | disconnect
+    WS_BACKPLANE: str = "memory"  # memory | redis
+    WS_BACKPLANE_URL: Optional[str] = None  # defaults to CELERY_BROKER_URL
+    WS_TYPING_WINDOW_MS: int = 250
+    WS_TYPING_TTL_SECONDS: float = 5.0
+    WS_PRESENCE_WINDOW_MS: int = 250
+    WS_SIGNAL_WINDOW_MS: int = 5
+    WS_HEARTBEAT_INTERVAL_SECONDS: float = 20.0
+    WS_IDLE_TIMEOUT_SECONDS: float = 60.0  # only for clients that have answered a ping
+    LIVE_SESSION_FLUSH_INTERVAL_SECONDS: float = 2.0
+    CHAT_HISTORY_BUFFER_SIZE: int = 50
+    CHAT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    CHAT_FLUSH_BATCH_SIZE: int = 500
+
+    # Tasks
+    TASK_BULK_MAX_OPERATIONS: int = 500
+    # Task lifecycle events, relayed from the task_events outbox to the Celery workers
+    OUTBOX_RELAY_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_RELAY_BATCH_SIZE: int = 100
+    OUTBOX_RETENTION_HOURS: int = 24
+    TASK_EVENT_MAX_RETRIES: int = 5
+
+    # In-process caches
+    USER_PROFILE_CACHE_SIZE: int = 10000
+    USER_PROFILE_CACHE_TTL_SECONDS: int = 300
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 30
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 256
+
+    # Token revocation
+    REVOCATION_BACKEND: str = "mongo"  # mongo | memory | redis | postgres
+    REVOCATION_REDIS_URL: Optional[str] = None  # defaults to CELERY_BROKER_URL
+    REVOCATION_PURGE_INTERVAL_SECONDS: float = 300.0
+    TOKEN_GENERATION_CACHE_TTL_SECONDS: int = 10
+    BLOCKLIST_SYNC_INTERVAL_SECONDS: float = 5.0
+    BLOCKLIST_BLOOM_CAPACITY: int = 100000
+    BLOCKLIST_BLOOM_ERROR_RATE: float = 0.001
+    BLOCKLIST_RECENT_MAX: int = 10000
 
     # Dynamically compute MONGO_URI after the class is instantiated
     @property
     def MONGO_URI(self) -> str:
+        if self.MONGO_URL:
+            return self.MONGO_URL
         escaped_username = quote_plus(self.MONGO_USERNAME)
         escaped_password = quote_plus(self.MONGO_PASSWORD)
         return (
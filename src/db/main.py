@@ -1,5 +1,9 @@
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from pathlib import Path
 from typing import AsyncGenerator
 from src.config import Config
 
@@ -25,13 +29,27 @@ async_session = sessionmaker(
     class_=AsyncSession
 )
 
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+# Any fixed key; serializes startup schema changes across nodes booting together
+SCHEMA_LOCK_KEY = 7215
+
+
+def run_migrations(connection):
+    alembic_config = AlembicConfig(str(ALEMBIC_INI))
+    alembic_config.attributes["connection"] = connection
+    command.upgrade(alembic_config, "head")
+
 # Start DB engine
 async def init_db():
     async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
         
         # Scans for any Base models & creates them
         await conn.run_sync(Base.metadata.create_all)
 
+        # Then brings tables that already existed up to date
+        await conn.run_sync(run_migrations)
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
\ No newline at end of file
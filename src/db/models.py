@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, Enum, ARRAY, Boolean, Date
+from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, Enum, ARRAY, Boolean, Date, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 import sqlalchemy.dialects.postgresql as pg
 from datetime import datetime, date, time
@@ -33,6 +33,9 @@ class LevelTier(str, PyEnum):
 
 class UserLevel(Base):
     __tablename__ = "user_levels"
+    __table_args__ = (
+        UniqueConstraint("user_id", "level_category", name="uq_user_levels_user_category"),
+    )
 
     id = Column(pg.UUID(as_uuid=True), default=uuid4, primary_key=True)
     user_id = Column(pg.UUID(as_uuid=True), ForeignKey("users.id", ondelete='CASCADE'), nullable=False)
@@ -90,6 +93,8 @@ class User(Base):
     password_hash = Column(String, nullable=False)
     role = Column(String, default="member", nullable=False)
     xp = Column(Integer, default=0, nullable=False)
+    # Day the daily completion bonus was last awarded, so it is paid at most once a day
+    daily_bonus_date = Column(Date, nullable=True)
     level = Column(Integer, default=1, nullable=False)
     badges = Column(ARRAY(String), default=[])
     avatar_url = Column(String, nullable=True)
@@ -146,6 +151,10 @@ class FriendRequest(Base):
     
 class WorkroomLiveSession(Base):
     __tablename__ = "workroom_live_sessions"
+    __table_args__ = (
+        # At most one active session per workroom, whichever node starts it
+        Index("uq_workroom_live_sessions_active", "workroom_id", unique=True, postgresql_where=text("is_active")),
+    )
     
     id = Column(pg.UUID(as_uuid=True), default=uuid4, primary_key=True)
     workroom_id = Column(pg.UUID(as_uuid=True), ForeignKey("workrooms.id", ondelete='CASCADE'), nullable=False)
@@ -157,6 +166,69 @@ class WorkroomLiveSession(Base):
     workroom = relationship("Workroom", back_populates="live_sessions")
     screen_sharer = relationship("User")
 
+class WorkroomChatMessage(Base):
+    __tablename__ = "workroom_chat_messages"
+    __table_args__ = (
+        Index("ix_workroom_chat_messages_workroom_created", "workroom_id", "created_at", "id"),
+    )
+
+    id = Column(pg.UUID(as_uuid=True), default=uuid4, primary_key=True)
+    workroom_id = Column(pg.UUID(as_uuid=True), ForeignKey("workrooms.id", ondelete='CASCADE'), nullable=False)
+    sender_id = Column(pg.UUID(as_uuid=True), ForeignKey("users.id", ondelete='SET NULL'), nullable=True)
+    content = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    workroom = relationship("Workroom", back_populates="chat_messages")
+    sender = relationship("User")
+
+class MailDeadLetter(Base):
+    __tablename__ = "mail_dead_letters"
+
+    id = Column(pg.UUID(as_uuid=True), default=uuid4, primary_key=True)
+    recipients = Column(ARRAY(String), nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    subtype = Column(String, nullable=True)
+    error = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class UserTokenGeneration(Base):
+    __tablename__ = "user_token_generations"
+
+    # A user without a row is at generation 0
+    user_id = Column(pg.UUID(as_uuid=True), ForeignKey("users.id", ondelete='CASCADE'), primary_key=True)
+    generation = Column(Integer, default=0, nullable=False)
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    # Crash-safe durability isn't needed for short-lived revocations; skipping the WAL keeps writes cheap
+    __table_args__ = (
+        Index("ix_revoked_tokens_expires_at", "expires_at"),
+        {"prefixes": ["UNLOGGED"]},
+    )
+
+    jti = Column(String, primary_key=True)
+    expires_at = Column(DateTime, nullable=False)
+
+class TaskEvent(Base):
+    """Transactional outbox: written with the task change, relayed to the workers afterwards"""
+    __tablename__ = "task_events"
+    __table_args__ = (
+        Index("ix_task_events_unpublished", "created_at", postgresql_where=text("published_at IS NULL")),
+        Index("ix_task_events_processed_at", "processed_at"),
+    )
+
+    id = Column(pg.UUID(as_uuid=True), default=uuid4, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    event_type = Column(String, nullable=False)
+    # Not a foreign key: the task may be deleted before its events are processed
+    task_id = Column(pg.UUID(as_uuid=True), nullable=False)
+    user_id = Column(pg.UUID(as_uuid=True), ForeignKey("users.id", ondelete='CASCADE'), nullable=False)
+    payload = Column(pg.JSONB, nullable=False, default=dict)
+    published_at = Column(DateTime, nullable=True)
+    processed_at = Column(DateTime, nullable=True)
+
 class Workroom(Base):
     __tablename__ = "workrooms"
 
@@ -176,10 +248,15 @@ class Workroom(Base):
     tasks = relationship("Task", back_populates="workroom", cascade="all, delete-orphan")
     leaderboards = relationship("Leaderboard", back_populates="workroom", cascade="all, delete-orphan")
     live_sessions = relationship("WorkroomLiveSession", back_populates="workroom", cascade="all, delete-orphan")
+    chat_messages = relationship("WorkroomChatMessage", back_populates="workroom", cascade="all, delete-orphan")
 
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_created_by_created", "created_by_id", "created_at", "id"),
+        Index("ix_tasks_workroom_created", "workroom_id", "created_at", "id"),
+    )
 
     id = Column(pg.UUID(as_uuid=True), default=uuid4, primary_key=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -259,7 +336,7 @@ class UserStreak(Base):
     __tablename__ = "user_streaks"
 
     id = Column(pg.UUID(as_uuid=True), default=uuid4, primary_key=True)
-    user_id = Column(pg.UUID(as_uuid=True), ForeignKey("users.id", ondelete='CASCADE'), nullable=False)
+    user_id = Column(pg.UUID(as_uuid=True), ForeignKey("users.id", ondelete='CASCADE'), unique=True, nullable=False)
     current_streak = Column(Integer, default=1)
     last_active_date = Column(Date, nullable=True)
     highest_streak = Column(Integer, default=1)
@@ -1,15 +1,38 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from bson import ObjectId
 import pymongo.errors
 from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Set
+from src.bloom import BloomFilter
 from src.config import Config
+from src.revocation import RevocationStore
+import asyncio
 import logging
 
 JTI_EXPIRY = 3600
+# Each delta pull re-reads this much history to cover clock skew between writers
+SYNC_OVERLAP = 30
 
-class MongoBlocklist:
-    def __init__(self):
+class MongoBlocklist(RevocationStore):
+    """Revoked JTIs in Mongo, fronted by a local bloom filter and an exact set of recent revocations.
+
+    Most lookups are answered "not revoked" by the filter without I/O; only a possible hit
+    goes to Mongo. Revocations from other workers arrive through periodic delta pulls, so
+    while the local copy is stale every lookup falls back to Mongo.
+    """
+
+    name = "mongo"
+
+    def __init__(self, sync_interval: float = Config.BLOCKLIST_SYNC_INTERVAL_SECONDS):
         self.mongo_client: AsyncIOMotorClient | None = None
         self.blocklist_collection: AsyncIOMotorDatabase | None = None
+        self.sync_interval = sync_interval
+        self.bloom = self._new_bloom()
+        self.recent: Dict[str, datetime] = {}  # jti: expiry, revoked since the last rebuild
+        self.synced_at: Optional[datetime] = None
+        self.rebuilt_at: Optional[datetime] = None
+        self.sync_task: Optional[asyncio.Task] = None
+        self.counters = {'local_negatives': 0, 'recent_hits': 0, 'mongo_lookups': 0, 'false_positives': 0}
 
     async def initialize(self):
         try:
@@ -19,6 +42,8 @@ class MongoBlocklist:
             await self.mongo_client.admin.command('ping')
             logging.info("Successfully connected to MongoDB")
             await self._create_ttl_index()
+            await self.rebuild()
+            self.sync_task = asyncio.create_task(self._sync_loop())
         except pymongo.errors.ConnectionFailure as e:
             logging.error(f"MongoDB connection failed: {e}")
             raise
@@ -26,27 +51,126 @@ class MongoBlocklist:
             logging.error(f"Error initializing MongoDB: {e}")
             raise
 
-    async def add_jti_to_blocklist(self, jti: str) -> None:
+    async def close(self):
+        if self.sync_task:
+            self.sync_task.cancel()
+            self.sync_task = None
+
+    async def start(self):
+        await self.initialize()
+
+    async def stop(self):
+        await self.close()
+
+    async def add_jti_to_blocklist(self, jti: str, ttl: float = JTI_EXPIRY) -> None:
+        await self.revoke_many({jti: ttl})
+
+    async def revoke_many(self, tokens: Dict[str, float]):
+        now = datetime.utcnow()
+        documents = [{"jti": jti, "expiry": now + timedelta(seconds=ttl)} for jti, ttl in tokens.items()]
+        # Honoured on this worker immediately, even if the write below fails
+        for document in documents:
+            self.recent[document["jti"]] = document["expiry"]
         try:
-            expiry_time = datetime.utcnow() + timedelta(seconds=JTI_EXPIRY)
-            await self.blocklist_collection.insert_one({
-                "jti": jti,
-                "expiry": expiry_time
-            })
-            logging.info(f"Added {jti} to blocklist with expiry at {expiry_time}")
+            await self.blocklist_collection.insert_many(documents, ordered=False)
+            logging.info(f"Added {len(documents)} tokens to blocklist")
         except Exception as e:
             logging.error(f"Error adding to blocklist: {e}")
 
     async def token_in_blocklist(self, jti: str) -> bool:
+        return await self.is_revoked(jti)
+
+    async def revoked(self, jtis: Iterable[str]) -> Set[str]:
+        now = datetime.utcnow()
+        synced = self.is_synced(now)
+        revoked = set()
+        candidates = []
+        for jti in jtis:
+            expiry = self.recent.get(jti)
+            if expiry is not None and expiry > now:
+                self.counters['recent_hits'] += 1
+                revoked.add(jti)
+            elif synced and jti not in self.bloom:
+                self.counters['local_negatives'] += 1
+            else:
+                candidates.append(jti)
+
+        if not candidates:
+            return revoked
+
+        self.counters['mongo_lookups'] += 1
         try:
-            token = await self.blocklist_collection.find_one({
-                "jti": jti,
-                "expiry": {"$gt": datetime.utcnow()}
-            })
-            return token is not None
+            cursor = self.blocklist_collection.find({
+                "jti": {"$in": candidates},
+                "expiry": {"$gt": now}
+            }, {"jti": 1})
+            found = {token["jti"] async for token in cursor}
+            if synced:
+                self.counters['false_positives'] += len(candidates) - len(found)
+            return revoked | found
         except Exception as e:
             logging.error(f"Error checking blocklist: {e}")
+            return revoked
+
+    def is_synced(self, now: Optional[datetime] = None) -> bool:
+        """Whether the local copy is recent enough to answer negatives on its own"""
+        if self.synced_at is None:
             return False
+        now = now or datetime.utcnow()
+        return now - self.synced_at < timedelta(seconds=self.sync_interval * 3)
+
+    def _new_bloom(self) -> BloomFilter:
+        return BloomFilter(Config.BLOCKLIST_BLOOM_CAPACITY, Config.BLOCKLIST_BLOOM_ERROR_RATE)
+
+    async def rebuild(self):
+        """Reload every unexpired JTI into a fresh filter, dropping expired ones"""
+        started_at = datetime.utcnow()
+        bloom = self._new_bloom()
+        cursor = self.blocklist_collection.find({"expiry": {"$gt": started_at}}, {"jti": 1})
+        async for token in cursor:
+            bloom.add(token["jti"])
+
+        # Keep revocations the new filter doesn't cover, e.g. ones written after the snapshot
+        self.recent = {
+            jti: expiry for jti, expiry in self.recent.items()
+            if expiry > started_at and jti not in bloom
+        }
+        self.bloom = bloom
+        self.rebuilt_at = self.synced_at = started_at
+        if bloom.is_full():
+            logging.warning(f"Blocklist bloom filter holds {bloom.count} JTIs, above its capacity of {bloom.capacity}")
+        logging.info(f"Loaded {bloom.count} revoked tokens into the blocklist filter")
+
+    async def pull_delta(self):
+        """Fetch revocations written since the last sync into the exact recent set"""
+        started_at = datetime.utcnow()
+        since = ObjectId.from_datetime(self.synced_at - timedelta(seconds=SYNC_OVERLAP))
+        cursor = self.blocklist_collection.find({"_id": {"$gte": since}}, {"jti": 1, "expiry": 1})
+        async for token in cursor:
+            self.recent[token["jti"]] = token["expiry"]
+        self.recent = {jti: expiry for jti, expiry in self.recent.items() if expiry > started_at}
+        self.synced_at = started_at
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                stale = datetime.utcnow() - self.rebuilt_at > timedelta(seconds=JTI_EXPIRY)
+                if stale or len(self.recent) > Config.BLOCKLIST_RECENT_MAX:
+                    await self.rebuild()
+                else:
+                    await self.pull_delta()
+            except Exception as e:
+                logging.error(f"Error syncing blocklist: {e}")
+
+    def metrics(self) -> Dict:
+        return {
+            'backend': self.name,
+            **self.counters,
+            'filtered': self.bloom.count,
+            'recent': len(self.recent),
+            'synced': self.is_synced(),
+        }
 
     async def _create_ttl_index(self):
         try:
@@ -0,0 +1,214 @@
+from typing import Dict, List, Optional
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.db.main import async_session
+from src.db.models import WorkroomLiveSession
+from src.config import Config
+from datetime import datetime
+import asyncio
+import logging
+import uuid
+
+
+class LiveSessionState:
+    """In-memory copy of a WorkroomLiveSession row; attribute names match the model"""
+
+    def __init__(
+        self,
+        workroom_id: str,
+        id: Optional[uuid.UUID] = None,
+        is_active: bool = True,
+        screen_sharer_id: Optional[str] = None,
+        created_at: Optional[datetime] = None,
+        ended_at: Optional[datetime] = None,
+    ):
+        self.id = id or uuid.uuid4()
+        self.workroom_id = workroom_id
+        self.is_active = is_active
+        self.screen_sharer_id = screen_sharer_id
+        self.created_at = created_at or datetime.utcnow()
+        self.ended_at = ended_at
+
+    @classmethod
+    def from_model(cls, live_session: WorkroomLiveSession) -> "LiveSessionState":
+        return cls(
+            workroom_id=str(live_session.workroom_id),
+            id=live_session.id,
+            is_active=live_session.is_active,
+            screen_sharer_id=str(live_session.screen_sharer_id) if live_session.screen_sharer_id else None,
+            created_at=live_session.created_at,
+            ended_at=live_session.ended_at,
+        )
+
+    @classmethod
+    def from_message(cls, message: Dict) -> "LiveSessionState":
+        return cls(
+            workroom_id=message['workroom_id'],
+            id=uuid.UUID(message['id']),
+            is_active=message['is_active'],
+            screen_sharer_id=message['screen_sharer_id'],
+            created_at=datetime.fromisoformat(message['created_at']),
+            ended_at=datetime.fromisoformat(message['ended_at']) if message['ended_at'] else None,
+        )
+
+    def to_message(self) -> Dict:
+        """JSON-safe copy for other nodes"""
+        return {
+            'id': str(self.id),
+            'workroom_id': str(self.workroom_id),
+            'is_active': self.is_active,
+            'screen_sharer_id': self.screen_sharer_id,
+            'created_at': self.created_at.isoformat(),
+            'ended_at': self.ended_at.isoformat() if self.ended_at else None,
+        }
+
+    def to_row(self) -> Dict:
+        return {
+            'id': self.id,
+            'workroom_id': uuid.UUID(str(self.workroom_id)),
+            'is_active': self.is_active,
+            'screen_sharer_id': uuid.UUID(str(self.screen_sharer_id)) if self.screen_sharer_id else None,
+            'created_at': self.created_at,
+            'ended_at': self.ended_at,
+        }
+
+
+class LiveSessionStore:
+    """Live-session state for the workrooms this node has sockets in.
+
+    A workroom's active session is a single row shared by every node: the first node to need
+    one inserts it and the others load it, so starting and ending a session are written through.
+    Screen-sharer changes are written behind in batches, and WebSocketManager replicates every
+    change over the backplane so the nodes in a room keep the same copy. A node forgets its copy
+    once its last socket in the room leaves, since it no longer hears those updates.
+    """
+
+    def __init__(self, flush_interval: float = Config.LIVE_SESSION_FLUSH_INTERVAL_SECONDS):
+        self.flush_interval = flush_interval
+        self.sessions: Dict[str, LiveSessionState] = {}  # workroom_id: active session
+        self.dirty: Dict[uuid.UUID, LiveSessionState] = {}  # session id: state awaiting flush
+        self.flush_task: Optional[asyncio.Task] = None
+        self.flushed = 0
+
+    async def start(self):
+        self.flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self.flush_task:
+            self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
+        await self.flush()
+
+    async def load(self, workroom_id: str, session: AsyncSession) -> LiveSessionState:
+        """The workroom's active session row, inserting one if there is none"""
+        # The partial unique index lets only one node's row in when several start it at once
+        await session.execute(
+            insert(WorkroomLiveSession)
+            .values(LiveSessionState(workroom_id).to_row())
+            .on_conflict_do_nothing(
+                index_elements=[WorkroomLiveSession.workroom_id],
+                index_where=WorkroomLiveSession.is_active == True
+            )
+        )
+        live_session = await self._select_active(workroom_id, session)
+        await session.commit()
+        return LiveSessionState.from_model(live_session)
+
+    async def _select_active(self, workroom_id: str, session: AsyncSession) -> Optional[WorkroomLiveSession]:
+        active = (WorkroomLiveSession.workroom_id == workroom_id) & (WorkroomLiveSession.is_active == True)
+        result = await session.execute(
+            select(WorkroomLiveSession).where(active).order_by(WorkroomLiveSession.created_at.desc()).limit(1)
+        )
+        return result.scalars().first()
+
+    def get(self, workroom_id: str) -> Optional[LiveSessionState]:
+        return self.sessions.get(workroom_id)
+
+    async def find(self, workroom_id: str, session: AsyncSession) -> Optional[LiveSessionState]:
+        """The workroom's active session without creating one: this node's copy, else the shared row"""
+        live_session = self.sessions.get(workroom_id)
+        if live_session is None:
+            row = await self._select_active(workroom_id, session)
+            live_session = LiveSessionState.from_model(row) if row else None
+        return live_session
+
+    async def get_or_create(self, workroom_id: str, session: AsyncSession) -> LiveSessionState:
+        live_session = self.sessions.get(workroom_id)
+        if live_session is None:
+            live_session = await self.load(workroom_id, session)
+            # Another caller may have loaded it meanwhile; keep the copy already handed out
+            live_session = self.sessions.setdefault(workroom_id, live_session)
+        return live_session
+
+    async def set_screen_sharer(self, workroom_id: str, user_id: Optional[str], session: AsyncSession) -> LiveSessionState:
+        live_session = await self.get_or_create(workroom_id, session)
+        live_session.screen_sharer_id = str(user_id) if user_id else None
+        self.dirty[live_session.id] = live_session
+        return live_session
+
+    async def end(self, workroom_id: str, session: AsyncSession) -> LiveSessionState:
+        live_session = await self.get_or_create(workroom_id, session)
+        live_session.is_active = False
+        live_session.ended_at = datetime.utcnow()
+        self.sessions.pop(workroom_id, None)
+        self.dirty.pop(live_session.id, None)
+        await session.execute(
+            update(WorkroomLiveSession)
+            .where(WorkroomLiveSession.id == live_session.id)
+            .values(is_active=False, ended_at=live_session.ended_at, screen_sharer_id=live_session.to_row()['screen_sharer_id'])
+        )
+        await session.commit()
+        return live_session
+
+    def forget(self, workroom_id: str):
+        """Drop this node's copy; pending screen-sharer writes are still flushed"""
+        self.sessions.pop(workroom_id, None)
+
+    def apply(self, message: Dict):
+        """Take a change another node made to a session this node holds a copy of"""
+        state = LiveSessionState.from_message(message)
+        if state.workroom_id not in self.sessions:
+            return
+        if state.is_active:
+            live_session = self.sessions[state.workroom_id]
+            if live_session.id == state.id:
+                live_session.screen_sharer_id = state.screen_sharer_id
+            else:
+                self.sessions[state.workroom_id] = state
+        elif self.sessions[state.workroom_id].id == state.id:
+            del self.sessions[state.workroom_id]
+
+    async def flush(self):
+        """Write every changed screen sharer in one executemany UPDATE"""
+        if not self.dirty:
+            return
+
+        batch: List[LiveSessionState] = list(self.dirty.values())
+        self.dirty = {}
+        rows = [
+            {'id': live_session.id, 'screen_sharer_id': live_session.to_row()['screen_sharer_id']}
+            for live_session in batch
+        ]
+        try:
+            async with async_session() as session:
+                await session.execute(update(WorkroomLiveSession), rows)
+                await session.commit()
+            self.flushed += len(batch)
+        except Exception as e:
+            logging.error(f"Error flushing {len(batch)} live sessions: {e}")
+            # Retry on the next tick unless a newer change already superseded them
+            for live_session in batch:
+                self.dirty.setdefault(live_session.id, live_session)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+live_session_store = LiveSessionStore()
@@ -1,6 +1,12 @@
 from fastapi_mail import FastMail, ConnectionConfig, MessageSchema
 from src.config import Config
 from pathlib import Path
+from typing import AsyncIterator, Deque, List, Optional
+from collections import deque
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+import aiosmtplib
+import asyncio
 
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -31,4 +37,112 @@ def create_message(recipients: list[str], subject: str, body: str):
         subtype="html"
     )
 
-    return message
\ No newline at end of file
+    return message
+
+def message_payload(message: MessageSchema) -> dict:
+    """A JSON-serializable form of a message, for handing to the mail worker"""
+    return {
+        "recipients": [getattr(recipient, "email", str(recipient)) for recipient in message.recipients],
+        "subject": message.subject,
+        "body": message.body,
+        "subtype": getattr(message.subtype, "value", message.subtype),
+    }
+
+
+def build_email(payload: dict, sender: str) -> EmailMessage:
+    email = EmailMessage()
+    email["From"] = sender
+    email["To"] = ", ".join(payload["recipients"])
+    email["Subject"] = payload["subject"]
+    email.set_content(payload["body"], subtype=payload.get("subtype") or "html")
+    return email
+
+
+def is_permanent_failure(error: BaseException) -> bool:
+    """5xx replies (unknown mailbox, rejected content) won't succeed on retry"""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(refused.code >= 500 for refused in error.recipients)
+    return isinstance(error, aiosmtplib.SMTPResponseException) and error.code >= 500
+
+
+class SMTPPool:
+    """Up to `size` authenticated SMTP connections, kept open and reused between messages"""
+
+    def __init__(
+        self,
+        size: int = Config.MAIL_POOL_SIZE,
+        hostname: str = Config.MAIL_SERVER,
+        port: int = Config.MAIL_PORT,
+        username: Optional[str] = Config.MAIL_USERNAME if Config.USE_CREDENTIALS else None,
+        password: Optional[str] = Config.MAIL_PASSWORD if Config.USE_CREDENTIALS else None,
+        start_tls: bool = Config.MAIL_STARTTLS,
+        use_tls: bool = Config.MAIL_SSL_TLS,
+        validate_certs: bool = Config.VALIDATE_CERTS,
+        timeout: float = Config.MAIL_TIMEOUT_SECONDS,
+    ):
+        self.size = size
+        self.settings = dict(
+            hostname=hostname, port=port, username=username, password=password,
+            start_tls=start_tls, use_tls=use_tls, validate_certs=validate_certs, timeout=timeout,
+        )
+        self.idle: Deque[aiosmtplib.SMTP] = deque()
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.opened = 0
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(**self.settings)
+        await smtp.connect()
+        self.opened += 1
+        return smtp
+
+    @asynccontextmanager
+    async def connection(self, fresh: bool = False) -> AsyncIterator[aiosmtplib.SMTP]:
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.size)
+        async with self.semaphore:
+            smtp = self.idle.pop() if self.idle and not fresh else None
+            if smtp is None or not smtp.is_connected:
+                smtp = await self._connect()
+            try:
+                yield smtp
+            finally:
+                # A refused message leaves the session usable; a dropped one does not
+                if smtp.is_connected:
+                    self.idle.append(smtp)
+
+    async def close(self):
+        while self.idle:
+            smtp = self.idle.pop()
+            try:
+                await smtp.quit()
+            except aiosmtplib.SMTPException:
+                smtp.close()
+
+
+class MailDelivery:
+    """Sends message payloads over a shared SMTP pool"""
+
+    def __init__(self, pool: SMTPPool, sender: str = f"{Config.MAIL_FROM_NAME} <{Config.MAIL_FROM}>"):
+        self.pool = pool
+        self.sender = sender
+        self.sent = 0
+        self.failed = 0
+
+    async def send(self, payload: dict):
+        email = build_email(payload, self.sender)
+        try:
+            async with self.pool.connection() as smtp:
+                await smtp.send_message(email)
+        except aiosmtplib.SMTPServerDisconnected:
+            # The server closed an idle pooled connection; one retry on a new one
+            async with self.pool.connection(fresh=True) as smtp:
+                await smtp.send_message(email)
+
+    async def send_batch(self, payloads: List[dict]) -> List[Optional[BaseException]]:
+        """Send every payload, returning the error (or None) for each in order"""
+        results = await asyncio.gather(*(self.send(payload) for payload in payloads), return_exceptions=True)
+        errors = [result if isinstance(result, BaseException) else None for result in results]
+        failed = sum(error is not None for error in errors)
+        self.sent += len(errors) - failed
+        self.failed += failed
+        return errors
@@ -1,39 +1,300 @@
-from typing import Dict, List, Optional
+from typing import Deque, Dict, List, Optional, Tuple
 from fastapi import status
-from fastapi.websockets import WebSocket
-from collections import defaultdict
+from fastapi.websockets import WebSocket, WebSocketDisconnect
+from collections import deque
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, exists
-from src.db.models import WorkroomLiveSession, User, WorkroomMemberLink
+from src.db.models import User, WorkroomMemberLink
+from src.db.main import async_session
+from src.config import Config
+from src.backplane import NODES_CHANNEL, Backplane, create_backplane, workroom_channel
+from src.codec import JSON_CODEC, Codec, Frame, accepted_subprotocol
+from src.chat import ChatHistory, chat_history
+from src.cache import TTLCache, forget_cached_user, user_profile_cache
+from src.live_session import LiveSessionState, LiveSessionStore, live_session_store
+from src.throttle import PresenceBatcher, SignalBatcher, TypingAggregator
+from src.presence import PresenceRegistry, presence_registry
 from datetime import datetime
-import json
+from enum import Enum
+import asyncio
+import logging
+import uuid
+
+
+class OverflowPolicy(str, Enum):
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+def coalesce_key(message: dict) -> Optional[Tuple[str, ...]]:
+    """Key under which a queued message may be replaced by a newer one, None if it must be delivered"""
+    message_type = message.get('type')
+    if 'signal' in message:
+        # WebRTC offers and answers are not superseded by a later state update
+        return None
+    if message_type == 'presence':
+        user = message.get('user') or {}
+        return (message_type, str(user.get('id')))
+    if message_type in ('typing', 'screen_share_update', 'session_state', 'ping'):
+        return (message_type,)
+    return None
+
+
+class ClientConnection:
+    """A WebSocket with its own bounded outbound queue and sender task"""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        max_queue_size: int = Config.WS_SEND_QUEUE_SIZE,
+        overflow_policy: str = Config.WS_OVERFLOW_POLICY,
+        codec: Codec = JSON_CODEC,
+    ):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.codec = codec
+        self.max_queue_size = max_queue_size
+        self.overflow_policy = OverflowPolicy(overflow_policy)
+        self.queue: Deque[Tuple[Optional[Tuple[str, ...]], Frame]] = deque()
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.close_code: Optional[int] = None
+        self.sender_task: Optional[asyncio.Task] = None
+        self.last_seen = asyncio.get_running_loop().time()
+        self.answers_pings = False
+
+        # Lag counters
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_lag = 0
+
+    def start(self):
+        """Start the sender task draining this connection's queue"""
+        self.sender_task = asyncio.create_task(self._sender())
+
+    def enqueue(self, message: dict) -> bool:
+        """Queue a message meant for this connection only"""
+        return self.enqueue_frame(Frame(message), coalesce_key(message))
+
+    def enqueue_frame(self, frame: Frame, key: Optional[Tuple[str, ...]] = None) -> bool:
+        """Queue a shared frame without blocking, applying the overflow policy when full"""
+        if self.closed:
+            return False
+
+        if len(self.queue) >= self.max_queue_size:
+            if self.overflow_policy == OverflowPolicy.COALESCE:
+                if key is not None:
+                    # Replace the newest match so no older frame for the key is sent after this one
+                    for index in range(len(self.queue) - 1, -1, -1):
+                        if self.queue[index][0] == key:
+                            self.queue[index] = (key, frame)
+                            self.coalesced += 1
+                            return True
+                # Make room by dropping the oldest transient frame; chat and signals are never dropped
+                for index, (queued_key, _) in enumerate(self.queue):
+                    if queued_key is not None:
+                        del self.queue[index]
+                        self.dropped += 1
+                        break
+                else:
+                    return self._disconnect_slow_consumer()
+            elif self.overflow_policy == OverflowPolicy.DISCONNECT:
+                return self._disconnect_slow_consumer()
+            else:
+                self.queue.popleft()
+                self.dropped += 1
+
+        self.queue.append((key, frame))
+        self.enqueued += 1
+        self.max_lag = max(self.max_lag, len(self.queue))
+        self.ready.set()
+        return True
+
+    def _disconnect_slow_consumer(self) -> bool:
+        logging.warning(f"Disconnecting slow consumer {self.user_id}: {len(self.queue)} messages behind")
+        self.dropped += len(self.queue)
+        self.queue.clear()
+        self.closed = True
+        self.close_code = status.WS_1013_TRY_AGAIN_LATER
+        self.ready.set()
+        return False
+
+    def enqueue_ping(self, frame: Frame):
+        """Queue a heartbeat ping, never behind another one and never in place of a real frame"""
+        if self.closed:
+            return
+        for index, (queued_key, _) in enumerate(self.queue):
+            if queued_key == ('ping',):
+                self.queue[index] = (('ping',), frame)
+                self.coalesced += 1
+                return
+        if len(self.queue) < self.max_queue_size:
+            self.enqueue_frame(frame, ('ping',))
+
+    async def _sender(self):
+        """Drain the queue onto the socket so a slow client only delays itself"""
+        try:
+            while not self.closed:
+                await self.ready.wait()
+                self.ready.clear()
+                while self.queue and not self.closed:
+                    _, frame = self.queue.popleft()
+                    await self.codec.send(self.websocket, frame.encode(self.codec))
+                    self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.warning(f"Send to {self.user_id} failed: {e}")
+            self.closed = True
+            return
+
+        if self.close_code is not None:
+            try:
+                await self.websocket.close(code=self.close_code)
+            except Exception as e:
+                logging.debug(f"Close of {self.user_id} failed: {e}")
+
+    def close(self):
+        """Stop the sender task and discard anything still queued"""
+        self.closed = True
+        self.queue.clear()
+        if self.sender_task and not self.sender_task.done():
+            self.sender_task.cancel()
+
+    def touch(self):
+        """Record that the client is alive"""
+        self.last_seen = asyncio.get_running_loop().time()
+
+    def idle_for(self) -> float:
+        return asyncio.get_running_loop().time() - self.last_seen
+
+    def stats(self) -> Dict:
+        return {
+            'user_id': self.user_id,
+            'idle_seconds': round(self.idle_for(), 3),
+            'lag': len(self.queue),
+            'max_lag': self.max_lag,
+            'enqueued': self.enqueued,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'encoding': self.codec.name,
+            'closed': self.closed,
+        }
+
 
 class WebSocketManager:
-    def __init__(self):
-        self.active_connections: Dict[str, Dict[str, WebSocket]] = defaultdict(dict)
+    def __init__(
+        self,
+        max_queue_size: int = Config.WS_SEND_QUEUE_SIZE,
+        overflow_policy: str = Config.WS_OVERFLOW_POLICY,
+        backplane: Optional[Backplane] = None,
+        user_cache: TTLCache = user_profile_cache,
+        live_sessions: LiveSessionStore = live_session_store,
+        chat: ChatHistory = chat_history,
+        registry: PresenceRegistry = presence_registry,
+    ):
+        self.max_queue_size = max_queue_size
+        self.overflow_policy = OverflowPolicy(overflow_policy)
+        self.node_id = uuid.uuid4().hex
+        self.backplane = backplane or create_backplane()
+        self.registry = registry
         self.active_sessions: Dict[str, str] = {}  # workroom_id: session_id
-        self.user_data_cache: Dict[str, Dict] = {}
+        self.user_cache = user_cache
+        self.live_sessions = live_sessions
+        self.chat = chat
+        self.typing = TypingAggregator(
+            self.deliver_local_message,
+            window=Config.WS_TYPING_WINDOW_MS / 1000,
+            ttl=Config.WS_TYPING_TTL_SECONDS
+        )
+        self.presence = PresenceBatcher(self.broadcast, window=Config.WS_PRESENCE_WINDOW_MS / 1000)
+        self.signals = SignalBatcher(self.send_to_user, window=Config.WS_SIGNAL_WINDOW_MS / 1000)
+        self.heartbeat_interval = Config.WS_HEARTBEAT_INTERVAL_SECONDS
+        self.idle_timeout = Config.WS_IDLE_TIMEOUT_SECONDS
+        # Room memberships are refreshed every heartbeat; a dead node's lapse after three missed ones
+        self.membership_ttl = 3 * self.heartbeat_interval
+        self.heartbeat_task: Optional[asyncio.Task] = None
+        self.reaped = 0
+
+    async def start(self):
+        """Start receiving events published by other nodes and reaping dead sockets"""
+        await self.backplane.start(self.handle_backplane_message)
+        await self.backplane.subscribe(NODES_CHANNEL)
+        self.heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        """Close local sockets' sender tasks and leave the backplane"""
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+            self.heartbeat_task = None
+        for workroom_id, user_id, connection in self.registry.all_connections():
+            connection.close()
+            await self.backplane.remove_members(workroom_channel(workroom_id), [self.member(user_id)])
+        self.typing.close()
+        self.presence.close()
+        self.signals.close()
+        await self.backplane.stop()
         
     async def get_user_data(self, user_id: str, session: AsyncSession) -> Dict:
         """Get user data from cache or database"""
-        if user_id in self.user_data_cache:
-            return self.user_data_cache[user_id]
-            
-        result = await session.execute(select(User).where(User.id == user_id))
-        user = result.scalars().first()
-        if not user:
-            return {}
-            
-        user_data = {
-            'id': str(user.id),
-            'username': user.username,
-            'avatar_url': user.avatar_url,
-            'first_name': user.first_name,
-            'last_name': user.last_name
-        }
-        self.user_data_cache[user_id] = user_data
-        return user_data
+        users_data = await self.get_users_data([user_id], session)
+        return users_data.get(str(user_id), {})
+
+    async def get_users_data(self, user_ids: List[str], session: AsyncSession) -> Dict[str, Dict]:
+        """Get user data for many users, loading every cache miss in a single query"""
+        users_data = {}
+        missing = []
+        for user_id in dict.fromkeys(str(user_id) for user_id in user_ids):
+            user_data = self.user_cache.get(user_id)
+            if user_data is None:
+                missing.append(user_id)
+            else:
+                users_data[user_id] = user_data
+
+        if missing:
+            result = await session.execute(
+                select(User.id, User.username, User.avatar_url, User.first_name, User.last_name)
+                .where(User.id.in_(missing))
+            )
+            for row in result:
+                user_data = {
+                    'id': str(row.id),
+                    'username': row.username,
+                    'avatar_url': row.avatar_url,
+                    'first_name': row.first_name,
+                    'last_name': row.last_name
+                }
+                self.user_cache.set(user_data['id'], user_data)
+                users_data[user_data['id']] = user_data
+
+        return users_data
         
+    async def forget_user(self, user_id: str):
+        """Drop cached copies of a user on this node and tell every other node to do the same"""
+        forget_cached_user(user_id)
+        await self.backplane.publish(NODES_CHANNEL, {
+            'origin': self.node_id,
+            'kind': 'forget_user',
+            'user_id': user_id
+        })
+
+    def member(self, user_id: str) -> str:
+        """This node's entry for a user in a room's cluster-wide membership"""
+        return f"{self.node_id}:{user_id}"
+
+    async def participants(self, workroom_id: str) -> List[str]:
+        """Everyone connected to the workroom on any node"""
+        participant_ids = self.registry.participants_of(workroom_id)
+        members = await self.backplane.members(workroom_channel(workroom_id))
+        if members is None:
+            return participant_ids
+        return list(dict.fromkeys(participant_ids + [member.split(':', 1)[1] for member in members]))
+
     async def verify_workroom_access(self, user_id: str, workroom_id: str, session: AsyncSession) -> bool:
         """Check if user has access to the workroom"""
         result = await session.execute(
@@ -44,33 +305,22 @@ class WebSocketManager:
         )
         return result.scalars().first()
         
-    async def get_or_create_live_session(self, workroom_id: str, session: AsyncSession) -> WorkroomLiveSession:
-        """Get active session or create new one"""
-        result = await session.execute(
-            select(WorkroomLiveSession)
-            .where(
-                WorkroomLiveSession.workroom_id == workroom_id,
-                WorkroomLiveSession.is_active == True
-            )
-        )
-        live_session = result.scalars().first()
-        
-        if not live_session:
-            live_session = WorkroomLiveSession(
-                workroom_id=workroom_id,
-                is_active=True
-            )
-            session.add(live_session)
-            await session.commit()
-            await session.refresh(live_session)
-            
+    async def get_or_create_live_session(self, workroom_id: str, session: AsyncSession) -> LiveSessionState:
+        """Get active session or create new one, shared by every node"""
+        live_session = await self.live_sessions.get_or_create(workroom_id, session)
+        if not self.registry.has_room(workroom_id):
+            # Not subscribed to the room, so a kept copy would miss other nodes' changes
+            self.live_sessions.forget(workroom_id)
         return live_session
         
+    async def find_live_session(self, workroom_id: str, session: AsyncSession) -> Optional[LiveSessionState]:
+        """Active session if there is one, read without starting one"""
+        return await self.live_sessions.find(workroom_id, session)
+
     async def update_screen_sharer(self, workroom_id: str, user_id: Optional[str], session: AsyncSession):
         """Update who is sharing their screen"""
-        live_session = await self.get_or_create_live_session(workroom_id, session)
-        live_session.screen_sharer_id = user_id
-        await session.commit()
+        live_session = await self.live_sessions.set_screen_sharer(workroom_id, user_id, session)
+        await self.publish_live_session(live_session)
         
         # Notify all clients
         await self.broadcast(workroom_id, {
@@ -80,86 +330,110 @@ class WebSocketManager:
         
     async def end_live_session(self, workroom_id: str, session: AsyncSession):
         """Mark session as ended"""
-        live_session = await self.get_or_create_live_session(workroom_id, session)
-        live_session.is_active = False
-        live_session.ended_at = datetime.utcnow()
-        await session.commit()
+        live_session = await self.live_sessions.end(workroom_id, session)
+        await self.publish_live_session(live_session)
         
         # Notify all clients
         await self.broadcast(workroom_id, {
             'type': 'session_end',
             'message': 'Live session has ended'
         })
+
+    async def publish_live_session(self, live_session: LiveSessionState):
+        """Give the other nodes in the room the same copy of a changed session"""
+        await self.backplane.publish(workroom_channel(live_session.workroom_id), {
+            'origin': self.node_id,
+            'kind': 'live_session',
+            'workroom_id': live_session.workroom_id,
+            'live_session': live_session.to_message()
+        })
         
-    async def connect(self, websocket: WebSocket, workroom_id: str, user_id: str, session: AsyncSession):
-        """Handle new WebSocket connection"""
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, workroom_id: str, user_id: str, session: AsyncSession, codec: Codec = JSON_CODEC) -> bool:
+        """Handle new WebSocket connection; returns False if the user may not join"""
+        await websocket.accept(subprotocol=accepted_subprotocol(websocket, codec))
         
         # Verify access
         if not await self.verify_workroom_access(user_id, workroom_id, session):
             # Send access denied message instead of closing
-            await websocket.send_json({
+            await codec.send(websocket, codec.encode({
                 'type': 'access_denied',
                 'message': 'You do not have access to this workroom',
                 'workroom_id': workroom_id,
                 'suggestion': 'Please request access from the workroom owner'
-            })
-            return
+            }))
+            return False
             
-        # Get or create live session
+        # Add to active connections, replacing any previous socket for this user
+        connection = ClientConnection(websocket, user_id, self.max_queue_size, self.overflow_policy, codec)
+        previous = self.registry.add(workroom_id, user_id, connection)
+        if previous:
+            previous.close()
+        connection.start()
+        if self.registry.room_size(workroom_id) == 1:
+            await self.backplane.subscribe(workroom_channel(workroom_id))
+        await self.backplane.add_members(workroom_channel(workroom_id), [self.member(user_id)], self.membership_ttl)
+
+        # Get or create live session, once subscribed so a node ending it can see this one
         live_session = await self.get_or_create_live_session(workroom_id, session)
         
-        # Add to active connections
-        self.active_connections[workroom_id][user_id] = websocket
-        
         # Get user data
         user_data = await self.get_user_data(user_id, session)
         
         # Notify others about new participant
-        await self.broadcast(workroom_id, {
+        await self.presence.add(workroom_id, {
             'type': 'presence',
             'action': 'join',
             'user': user_data,
             'timestamp': datetime.utcnow().isoformat()
-        }, exclude=[user_id])
+        })
         
         # Send current session state to new participant
-        await self.send_session_state(websocket, workroom_id, live_session, session)
+        await self.send_session_state(connection, workroom_id, live_session, session)
+        return True
         
-    async def send_session_state(self, websocket: WebSocket, workroom_id: str, live_session: WorkroomLiveSession, session: AsyncSession):
+    async def send_session_state(self, connection: ClientConnection, workroom_id: str, live_session: LiveSessionState, session: AsyncSession):
         """Send current session state to a client"""
-        # Get all participants
-        participants = []
-        for user_id in self.active_connections[workroom_id].keys():
-            user_data = await self.get_user_data(user_id, session)
-            participants.append(user_data)
-            # print(f"Participant Data for {user_id}: {user_data}")
-            
-        # Get screen sharer data if any
-        screen_sharer_data = None
-        if live_session.screen_sharer_id:
-            screen_sharer_data = await self.get_user_data(live_session.screen_sharer_id, session)
-            # print(f"Screen Sharer Data: {screen_sharer_data}")
+        # Get all participants and the screen sharer in one lookup
+        participant_ids = await self.participants(workroom_id)
+        screen_sharer_id = str(live_session.screen_sharer_id) if live_session.screen_sharer_id else None
+        users_data = await self.get_users_data(participant_ids + ([screen_sharer_id] if screen_sharer_id else []), session)
+
+        participants = [users_data[user_id] for user_id in participant_ids if user_id in users_data]
+        screen_sharer_data = users_data.get(screen_sharer_id) if screen_sharer_id else None
             
         session_state = {
             'type': 'session_state',
             'is_active': live_session.is_active,
             'screen_sharer': screen_sharer_data,
-            'participants': participants
+            'participants': participants,
+            'chat_history': await self.chat.recent(workroom_id, session, self.get_users_data)
         }
         # print(f"Sending Session State: {session_state}")
-        await websocket.send_json(session_state)
+        connection.enqueue(session_state)
         
     async def disconnect(self, websocket: WebSocket, workroom_id: str, user_id: str, session: AsyncSession):
         """Handle WebSocket disconnection"""
-        if workroom_id in self.active_connections and user_id in self.active_connections[workroom_id]:
-            del self.active_connections[workroom_id][user_id]
+        connection = self.registry.get(workroom_id, user_id)
+        if connection and connection.websocket is websocket:
+            # The registry drops empty workroom buckets itself
+            self.registry.remove(workroom_id, user_id)
+            connection.close()
+            await self.backplane.remove_members(workroom_channel(workroom_id), [self.member(user_id)])
+            room_empty = not self.registry.has_room(workroom_id)
+            if room_empty:
+                await self.backplane.unsubscribe(workroom_channel(workroom_id))
+                self.chat.forget(workroom_id)
             
             # Get user data
             user_data = await self.get_user_data(user_id, session)
+
+            # Someone who leaves mid-sentence stops typing
+            if self.typing.remove_user(workroom_id, user_id):
+                await self.publish_typing(workroom_id, user_data, False)
+            self.signals.remove_user(workroom_id, user_id)
             
             # Notify others about participant leaving
-            await self.broadcast(workroom_id, {
+            await self.presence.add(workroom_id, {
                 'type': 'presence',
                 'action': 'leave',
                 'user': user_data,
@@ -167,33 +441,172 @@ class WebSocketManager:
             })
             
             # If this was the screen sharer, clear the screen sharer
-            live_session = await self.get_or_create_live_session(workroom_id, session)
-            if live_session.screen_sharer_id == user_id:
+            live_session = self.live_sessions.get(workroom_id)
+            if live_session and live_session.screen_sharer_id == user_id:
                 await self.update_screen_sharer(workroom_id, None, session)
                 
-            # If no more participants, end session
-            if not self.active_connections[workroom_id]:
-                await self.end_live_session(workroom_id, session)
+            # If no node has participants left, end session. A node only subscribes to rooms it
+            # has sockets in, so other subscribers mean the room is still live elsewhere
+            if room_empty:
+                if await self.backplane.subscriber_count(workroom_channel(workroom_id)) == 0:
+                    await self.end_live_session(workroom_id, session)
+                else:
+                    self.live_sessions.forget(workroom_id)
+
+    async def reap(self, connection: ClientConnection, workroom_id: str, reason: str):
+        """Run the normal disconnect path for a peer that stopped responding"""
+        logging.info(f"Reaping {connection.user_id} from {workroom_id}: {reason}")
+        self.reaped += 1
+        try:
+            async with async_session() as session:
+                await self.disconnect(connection.websocket, workroom_id, connection.user_id, session)
+        finally:
+            # Unblocks the endpoint's receive loop if the peer is half-open
+            try:
+                await connection.websocket.close(code=status.WS_1001_GOING_AWAY)
+            except Exception:
+                pass
+
+    async def _heartbeat_loop(self):
+        """Ping every socket, reap the ones that are dead or have gone quiet, and keep this
+        node's room memberships from lapsing"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                ping = Frame({'type': 'ping', 'timestamp': datetime.utcnow().isoformat()})
+                for workroom_id, _, connection in self.registry.all_connections():
+                    if connection.closed:
+                        await self.reap(connection, workroom_id, "send failed")
+                    elif connection.answers_pings and connection.idle_for() > self.idle_timeout:
+                        # Clients that never answered a ping are left to the server's protocol-level
+                        # pings (uvicorn --ws-ping-interval), which end a dead peer with a disconnect
+                        await self.reap(connection, workroom_id, "idle timeout")
+                    else:
+                        connection.enqueue_ping(ping)
+                for workroom_id in self.registry.room_ids():
+                    members = [self.member(user_id) for user_id in self.registry.participants_of(workroom_id)]
+                    await self.backplane.add_members(workroom_channel(workroom_id), members, self.membership_ttl)
+            except Exception as e:
+                logging.error(f"Error in WebSocket heartbeat: {e}")
+
+    def metrics(self) -> Dict:
+        """Gauges for live sockets and rooms on this node, and a count of reaped sockets"""
+        return {
+            **self.registry.counts(),
+            'reaped': self.reaped,
+            'lagging_sockets': sum(1 for _, _, connection in self.registry.all_connections() if connection.queue),
+            **self.signals.stats(),
+        }
                 
     async def broadcast(self, workroom_id: str, message: dict, exclude: List[str] = None):
-        """Send message to all clients in workroom except those in exclude list"""
-        if workroom_id not in self.active_connections:
+        """Send message to all clients in workroom, on every node, except those in exclude list"""
+        exclude = exclude or []
+        # Serialize once per encoding; every local socket and every other node shares the frame
+        frame = Frame(message)
+        key = coalesce_key(message)
+        self.deliver_local(workroom_id, frame, key, exclude)
+        await self.backplane.publish(workroom_channel(workroom_id), {
+            'origin': self.node_id,
+            'kind': 'broadcast',
+            'workroom_id': workroom_id,
+            'type': message.get('type'),
+            'frame': frame.encode(JSON_CODEC),
+            'key': key,
+            'exclude': exclude
+        })
+
+    async def send_to_user(self, workroom_id: str, user_id: str, message: dict):
+        """Send message to one participant, wherever their socket lives"""
+        connection = self.registry.get(workroom_id, user_id)
+        if connection:
+            connection.enqueue(message)
             return
-            
+        await self.backplane.publish(workroom_channel(workroom_id), {
+            'origin': self.node_id,
+            'kind': 'user',
+            'workroom_id': workroom_id,
+            'target_user': user_id,
+            'frame': JSON_CODEC.encode(message),
+            'key': coalesce_key(message)
+        })
+
+    def deliver_local_message(self, workroom_id: str, message: dict):
+        """Queue message for the sockets connected to this node, encoded once per codec"""
+        self.deliver_local(workroom_id, Frame(message), coalesce_key(message))
+
+    async def publish_typing(self, workroom_id: str, user_data: dict, is_typing: bool):
+        """Tell other nodes about a typing state change so they can aggregate it too"""
+        await self.backplane.publish(workroom_channel(workroom_id), {
+            'origin': self.node_id,
+            'kind': 'typing',
+            'workroom_id': workroom_id,
+            'user': user_data,
+            'is_typing': is_typing
+        })
+
+    def deliver_local(self, workroom_id: str, frame: Frame, key: Optional[Tuple[str, ...]] = None, exclude: List[str] = None):
+        """Queue a shared frame for the sockets connected to this node"""
         exclude = exclude or []
-        for user_id, connection in self.active_connections[workroom_id].items():
+        for user_id, connection in self.registry.connections_in(workroom_id):
             if user_id not in exclude:
-                try:
-                    await connection.send_json(message)
-                except:
-                    # Handle disconnected clients
-                    pass
+                connection.enqueue_frame(frame, key)
+
+    async def handle_backplane_message(self, channel: str, envelope: dict):
+        """Deliver an event published by another node to local sockets"""
+        if envelope.get('origin') == self.node_id:
+            return
+
+        workroom_id = envelope.get('workroom_id')
+        kind = envelope.get('kind')
+        key = tuple(envelope['key']) if envelope.get('key') else None
+        if kind == 'broadcast':
+            frame = Frame.from_json(envelope['frame'])
+            self.deliver_local(workroom_id, frame, key, envelope.get('exclude'))
+            if envelope.get('type') == 'chat' and self.registry.has_room(workroom_id):
+                # The sending node persists it; this node only keeps it for replay
+                self.chat.remember(workroom_id, frame.message)
+        elif kind == 'user':
+            connection = self.registry.get(workroom_id, envelope.get('target_user'))
+            if connection:
+                connection.enqueue_frame(Frame.from_json(envelope['frame']), key)
+        elif kind == 'typing':
+            self.typing.update(workroom_id, envelope['user'], envelope.get('is_typing', False))
+        elif kind == 'live_session':
+            self.live_sessions.apply(envelope['live_session'])
+        elif kind == 'forget_user':
+            forget_cached_user(envelope['user_id'])
+
+    def get_connection_stats(self, workroom_id: str) -> List[Dict]:
+        """Per-connection lag counters for a workroom"""
+        return [connection.stats() for _, connection in self.registry.connections_in(workroom_id)]
+                    
+    async def receive_message(self, websocket: WebSocket, workroom_id: str, user_id: str, codec: Codec) -> dict:
+        """Read one client message in whichever encoding the client sent"""
+        message = await websocket.receive()
+        if message['type'] == 'websocket.disconnect':
+            raise WebSocketDisconnect(message.get('code', status.WS_1000_NORMAL_CLOSURE), message.get('reason'))
+        # Any frame shows the client is alive, whatever it carries
+        connection = self.registry.get(workroom_id, user_id)
+        if connection:
+            connection.touch()
+        if message.get('bytes') is not None:
+            return codec.decode(message['bytes'])
+        return JSON_CODEC.decode(message['text'])
                     
     async def handle_message(self, data: dict, workroom_id: str, user_id: str, session: AsyncSession):
         """Handle incoming WebSocket messages"""
+        connection = self.registry.get(workroom_id, user_id)
         message_type = data.get('type')
         
-        if message_type == 'chat':
+        if message_type == 'pong':
+            # From now on this client is expected to answer heartbeats
+            if connection:
+                connection.answers_pings = True
+            return
+        elif message_type == 'ping':
+            if connection:
+                connection.enqueue({'type': 'pong', 'timestamp': datetime.utcnow().isoformat()})
+        elif message_type == 'chat':
             await self.handle_chat_message(data, workroom_id, user_id, session)
         elif message_type == 'screen_share':
             await self.handle_screen_share(data, workroom_id, user_id, session)
@@ -204,12 +617,7 @@ class WebSocketManager:
         """Handle chat messages"""
         user_data = await self.get_user_data(sender_id, session)
         
-        message = {
-            'type': 'chat',
-            'sender': user_data,
-            'content': data['content'],
-            'timestamp': datetime.utcnow().isoformat()
-        }
+        message = self.chat.new_message(workroom_id, user_data, data['content'])
         await self.broadcast(workroom_id, message)
         
     async def handle_screen_share(self, data: dict, workroom_id: str, user_id: str, session: AsyncSession):
@@ -224,7 +632,7 @@ class WebSocketManager:
                 'signal': data.get('signal')
             })
             
-            # Update screen sharer in database
+            # Update screen sharer; persisted in the background
             await self.update_screen_sharer(workroom_id, user_id, session)
             
         elif action == 'stop':
@@ -235,23 +643,31 @@ class WebSocketManager:
             await self.update_screen_sharer(workroom_id, None, session)
             
         elif action == 'signal':
-            # Forward WebRTC signaling messages to specific participant
-            target_user = data.get('target_user')
-            if target_user and target_user in self.active_connections[workroom_id]:
-                await self.send_to_user(workroom_id, target_user, {
-                    'type': 'webrtc_signal',
-                    'signal': data.get('signal'),
-                    'sender': user_id
-                })
+            # Forward WebRTC signaling to one participant, ICE candidates coalesced per pair
+            signal = data.get('signal')
+            target_users = data.get('target_users') or ([data['target_user']] if data.get('target_user') else [])
+            for target_user in target_users:
+                await self.signals.add(workroom_id, user_id, str(target_user), signal)
+
+            if not target_users:
+                # The sharer's offer goes to every viewer as one shared frame
+                live_session = self.live_sessions.get(workroom_id)
+                if live_session and live_session.screen_sharer_id == user_id:
+                    await self.broadcast(workroom_id, {
+                        'type': 'webrtc_signal',
+                        'signal': signal,
+                        'sender': user_id
+                    }, exclude=[user_id])
             
     async def handle_typing_indicator(self, data: dict, workroom_id: str, sender_id: str, session: AsyncSession):
-        """Handle typing indicators"""
+        """Handle typing indicators, aggregated into one frame per workroom per window"""
         user_data = await self.get_user_data(sender_id, session)
-        
-        await self.broadcast(workroom_id, {
-            'type': 'typing',
-            'user': user_data,
-            'is_typing': data.get('is_typing', False)
-        }, exclude=[sender_id])
-        
-        
\ No newline at end of file
+        is_typing = data.get('is_typing', False)
+
+        # Other nodes only hear about state changes and keep-alives, not every keystroke
+        if self.typing.update(workroom_id, user_data, is_typing):
+            await self.publish_typing(workroom_id, user_data, is_typing)
+
+
+# One manager per process, shared by the WebSocket endpoint and the REST routes
+manager = WebSocketManager()
@@ -0,0 +1,166 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.backplane import Backplane, workroom_channel
+from src.celery_worker import publish_task
+from src.codec import JSON_CODEC
+from src.config import Config
+from src.db.main import async_session
+from src.db.models import TaskEvent, WorkroomMemberLink
+import asyncio
+import logging
+import time
+
+TASK_CREATED = "task_created"
+TASK_COMPLETED = "task_completed"
+COLLABORATOR_INVITED = "collaborator_invited"
+PURGE_INTERVAL = 300
+
+
+def task_event(event_type: str, task_id: UUID, user_id: UUID, payload: Optional[Dict] = None) -> Dict:
+    """A task_events row, for TaskEvent(**row) or a multi-row insert"""
+    return {
+        "id": uuid4(),
+        "created_at": datetime.utcnow(),
+        "event_type": event_type,
+        "task_id": task_id,
+        "user_id": user_id,
+        "payload": payload or {},
+    }
+
+
+def record_task_event(session: AsyncSession, event_type: str, task_id: UUID, user_id: UUID, payload: Optional[Dict] = None):
+    """Add an event to the caller's transaction; it is relayed to the workers once that commits"""
+    session.add(TaskEvent(**task_event(event_type, task_id, user_id, payload)))
+
+
+async def record_task_events(session: AsyncSession, rows: List[Dict]):
+    """Add several task_event rows to the caller's transaction with one INSERT"""
+    if rows:
+        await session.execute(insert(TaskEvent), rows)
+
+
+async def publish_to_workers(event_ids: List[str]):
+    # Imported here: the worker module imports this one for the consumer side
+    from src.celery_tasks import process_task_events
+
+    await publish_task(process_task_events, event_ids)
+
+
+class OutboxRelay:
+    """Moves committed task events from the task_events table onto the Celery queue.
+
+    Every web process runs one; FOR UPDATE SKIP LOCKED lets them share the table. Handlers
+    call notify() after committing so events go out without waiting for the next poll. A
+    crash between publishing and marking a batch publishes it again, which the consumer
+    tolerates because it applies each event at most once.
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[List[str]], Awaitable[None]] = publish_to_workers,
+        interval: float = Config.OUTBOX_RELAY_INTERVAL_SECONDS,
+        batch_size: int = Config.OUTBOX_RELAY_BATCH_SIZE,
+        retention: timedelta = timedelta(hours=Config.OUTBOX_RETENTION_HOURS),
+    ):
+        self.publish = publish
+        self.interval = interval
+        self.batch_size = batch_size
+        self.retention = retention
+        self.wakeup = asyncio.Event()
+        self.relay_task: Optional[asyncio.Task] = None
+        self.purge_at = 0.0
+        self.published = 0
+        self.purged = 0
+        self.failures = 0
+
+    async def start(self):
+        self.relay_task = asyncio.create_task(self._relay_loop())
+
+    async def stop(self):
+        if self.relay_task:
+            self.relay_task.cancel()
+            try:
+                await self.relay_task
+            except asyncio.CancelledError:
+                pass
+            self.relay_task = None
+
+    def notify(self):
+        self.wakeup.set()
+
+    async def relay_once(self) -> int:
+        """Publish one batch of unpublished events; returns how many went out"""
+        async with async_session() as session:
+            result = await session.execute(
+                select(TaskEvent.id)
+                .where(TaskEvent.published_at.is_(None))
+                .order_by(TaskEvent.created_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            event_ids = result.scalars().all()
+            if event_ids:
+                await self.publish([str(event_id) for event_id in event_ids])
+                await session.execute(
+                    update(TaskEvent).where(TaskEvent.id.in_(event_ids)).values(published_at=datetime.utcnow())
+                )
+            await session.commit()
+        self.published += len(event_ids)
+        return len(event_ids)
+
+    async def purge(self):
+        """Drop processed events older than the retention window"""
+        async with async_session() as session:
+            result = await session.execute(
+                delete(TaskEvent).where(TaskEvent.processed_at < datetime.utcnow() - self.retention)
+            )
+            await session.commit()
+        self.purged += result.rowcount or 0
+
+    async def _relay_loop(self):
+        while True:
+            try:
+                # Drain any backlog, then wait for a nudge or the next poll
+                while await self.relay_once() == self.batch_size:
+                    pass
+                if time.monotonic() >= self.purge_at:
+                    self.purge_at = time.monotonic() + PURGE_INTERVAL
+                    await self.purge()
+            except Exception as e:
+                self.failures += 1
+                logging.error(f"Error relaying task events: {e}")
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+    def metrics(self) -> Dict:
+        return {'published': self.published, 'purged': self.purged, 'failures': self.failures}
+
+
+async def notify_user(backplane: Backplane, user_id: UUID, message: Dict):
+    """Push a message to the user's sockets in every workroom they belong to, on whichever
+    node holds them"""
+    async with async_session() as session:
+        result = await session.execute(
+            select(WorkroomMemberLink.workroom_id).where(WorkroomMemberLink.user_id == user_id)
+        )
+        workroom_ids = [str(workroom_id) for workroom_id in result.scalars().all()]
+
+    frame = JSON_CODEC.encode(message)
+    for workroom_id in workroom_ids:
+        await backplane.publish(workroom_channel(workroom_id), {
+            'origin': 'task-events',
+            'kind': 'user',
+            'workroom_id': workroom_id,
+            'target_user': str(user_id),
+            'frame': frame,
+            'key': None
+        })
+
+
+outbox_relay = OutboxRelay()
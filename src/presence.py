@@ -0,0 +1,77 @@
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+
+class PresenceRegistry:
+    """Who is connected to this node, indexed both by workroom and by user.
+
+    Shared by the WebSocket endpoint and the REST live-session routes so both see the
+    same sockets. Every query is a dict/set lookup.
+    """
+
+    def __init__(self):
+        self.rooms: Dict[str, Dict[str, Any]] = {}  # workroom_id: {user_id: connection}
+        self.users: Dict[str, Set[str]] = {}  # user_id: {workroom_id}
+
+    def add(self, workroom_id: str, user_id: str, connection: Any) -> Optional[Any]:
+        """Register a connection; returns the one it replaces, if any"""
+        room = self.rooms.setdefault(workroom_id, {})
+        previous = room.get(user_id)
+        room[user_id] = connection
+        self.users.setdefault(user_id, set()).add(workroom_id)
+        return previous
+
+    def remove(self, workroom_id: str, user_id: str) -> Optional[Any]:
+        """Unregister a connection, dropping empty indexes; returns the removed connection"""
+        room = self.rooms.get(workroom_id)
+        if room is None or user_id not in room:
+            return None
+
+        connection = room.pop(user_id)
+        if not room:
+            del self.rooms[workroom_id]
+
+        user_rooms = self.users.get(user_id)
+        if user_rooms is not None:
+            user_rooms.discard(workroom_id)
+            if not user_rooms:
+                del self.users[user_id]
+        return connection
+
+    def get(self, workroom_id: str, user_id: str) -> Optional[Any]:
+        return self.rooms.get(workroom_id, {}).get(user_id)
+
+    def is_online(self, user_id: str) -> bool:
+        return user_id in self.users
+
+    def rooms_of(self, user_id: str) -> Set[str]:
+        return set(self.users.get(user_id, ()))
+
+    def participants_of(self, workroom_id: str) -> List[str]:
+        return list(self.rooms.get(workroom_id, ()))
+
+    def room_ids(self) -> List[str]:
+        return list(self.rooms)
+
+    def connections_in(self, workroom_id: str) -> List[Tuple[str, Any]]:
+        return list(self.rooms.get(workroom_id, {}).items())
+
+    def has_room(self, workroom_id: str) -> bool:
+        return workroom_id in self.rooms
+
+    def room_size(self, workroom_id: str) -> int:
+        return len(self.rooms.get(workroom_id, ()))
+
+    def all_connections(self) -> Iterator[Tuple[str, str, Any]]:
+        for workroom_id, room in list(self.rooms.items()):
+            for user_id, connection in list(room.items()):
+                yield workroom_id, user_id, connection
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            'sockets': sum(len(room) for room in self.rooms.values()),
+            'rooms': len(self.rooms),
+            'users': len(self.users),
+        }
+
+
+presence_registry = PresenceRegistry()
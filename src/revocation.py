@@ -0,0 +1,183 @@
+from typing import Dict, Iterable, Optional, Set
+from datetime import datetime, timedelta
+from redis import asyncio as aioredis
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from src.db.main import async_session
+from src.db.models import RevokedToken
+from src.config import Config
+import asyncio
+import logging
+import time
+
+
+class RevocationStore:
+    """Where revoked token JTIs live until the tokens themselves would have expired.
+
+    Backends implement the batch operations; the single-token ones are built on them.
+    """
+
+    name = "base"
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def revoke_many(self, tokens: Dict[str, float]):
+        """Revoke several JTIs at once, each kept for its ttl in seconds"""
+        raise NotImplementedError("Please Override this method in child classes")
+
+    async def revoked(self, jtis: Iterable[str]) -> Set[str]:
+        """The subset of jtis that are currently revoked"""
+        raise NotImplementedError("Please Override this method in child classes")
+
+    async def revoke(self, jti: str, ttl: float):
+        await self.revoke_many({jti: ttl})
+
+    async def is_revoked(self, jti: str) -> bool:
+        return jti in await self.revoked([jti])
+
+    def metrics(self) -> Dict:
+        return {'backend': self.name}
+
+
+class MemoryRevocationStore(RevocationStore):
+    """Revocations held in this process only; for tests and single-process deployments"""
+
+    name = "memory"
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.expires_at: Dict[str, float] = {}
+        self.sweep_at_size = 1024
+
+    async def revoke_many(self, tokens: Dict[str, float]):
+        now = self.clock()
+        for jti, ttl in tokens.items():
+            self.expires_at[jti] = now + ttl
+        if len(self.expires_at) >= self.sweep_at_size:
+            self.expires_at = {jti: expires_at for jti, expires_at in self.expires_at.items() if expires_at > now}
+            self.sweep_at_size = max(1024, len(self.expires_at) * 2)
+
+    async def revoked(self, jtis: Iterable[str]) -> Set[str]:
+        now = self.clock()
+        return {jti for jti in jtis if self.expires_at.get(jti, 0) > now}
+
+    def metrics(self) -> Dict:
+        return {'backend': self.name, 'entries': len(self.expires_at)}
+
+
+class RedisRevocationStore(RevocationStore):
+    """One key per revoked JTI, written with SETEX so Redis expires it with the token"""
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "revoked:"):
+        self.url = url
+        self.prefix = prefix
+        self.redis: Optional[aioredis.Redis] = None
+
+    def _client(self) -> aioredis.Redis:
+        if self.redis is None:
+            self.redis = aioredis.from_url(self.url)
+        return self.redis
+
+    async def stop(self):
+        if self.redis is not None:
+            await self.redis.close()
+            self.redis = None
+
+    async def revoke_many(self, tokens: Dict[str, float]):
+        async with self._client().pipeline(transaction=False) as pipe:
+            for jti, ttl in tokens.items():
+                pipe.setex(self.prefix + jti, max(1, int(ttl)), 1)
+            await pipe.execute()
+
+    async def revoked(self, jtis: Iterable[str]) -> Set[str]:
+        jtis = list(jtis)
+        if not jtis:
+            return set()
+        values = await self._client().mget([self.prefix + jti for jti in jtis])
+        return {jti for jti, value in zip(jtis, values) if value is not None}
+
+
+class PostgresRevocationStore(RevocationStore):
+    """Revocations in an UNLOGGED table; expired rows are purged through the expiry index"""
+
+    name = "postgres"
+
+    def __init__(self, purge_interval: float = Config.REVOCATION_PURGE_INTERVAL_SECONDS):
+        self.purge_interval = purge_interval
+        self.purge_task: Optional[asyncio.Task] = None
+        self.purged = 0
+
+    async def start(self):
+        self.purge_task = asyncio.create_task(self._purge_loop())
+
+    async def stop(self):
+        if self.purge_task:
+            self.purge_task.cancel()
+            self.purge_task = None
+
+    async def revoke_many(self, tokens: Dict[str, float]):
+        if not tokens:
+            return
+        now = datetime.utcnow()
+        rows = [{'jti': jti, 'expires_at': now + timedelta(seconds=ttl)} for jti, ttl in tokens.items()]
+        statement = insert(RevokedToken).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[RevokedToken.jti],
+            set_={'expires_at': statement.excluded.expires_at}
+        )
+        async with async_session() as session:
+            await session.execute(statement)
+            await session.commit()
+
+    async def revoked(self, jtis: Iterable[str]) -> Set[str]:
+        jtis = list(jtis)
+        if not jtis:
+            return set()
+        async with async_session() as session:
+            result = await session.execute(
+                select(RevokedToken.jti).where(
+                    RevokedToken.jti.in_(jtis),
+                    RevokedToken.expires_at > datetime.utcnow()
+                )
+            )
+            return set(result.scalars().all())
+
+    async def purge(self):
+        async with async_session() as session:
+            result = await session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+            await session.commit()
+        self.purged += result.rowcount or 0
+
+    async def _purge_loop(self):
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try:
+                await self.purge()
+            except Exception as e:
+                logging.error(f"Error purging revoked tokens: {e}")
+
+    def metrics(self) -> Dict:
+        return {'backend': self.name, 'purged': self.purged}
+
+
+def create_revocation_store() -> RevocationStore:
+    """Build the store selected by REVOCATION_BACKEND"""
+    backend = Config.REVOCATION_BACKEND
+    if backend == "memory":
+        return MemoryRevocationStore()
+    if backend == "redis":
+        return RedisRevocationStore(Config.REVOCATION_REDIS_URL or Config.CELERY_BROKER_URL)
+    if backend == "postgres":
+        return PostgresRevocationStore()
+    # Imported here so deployments on another backend don't need Mongo at all
+    from src.db.mongo import mongo_blocklist
+    return mongo_blocklist
+
+
+revocation_store = create_revocation_store()
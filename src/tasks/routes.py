@@ -5,11 +5,11 @@ from datetime import datetime, date
 from typing import List
 from uuid import UUID
 from src.db.main import get_session
-from src.achievements.service import check_and_award_badges, update_user_streak
-from .service import calculate_task_points, check_daily_completion, get_friends_working_on_task
-from .schema import TaskCreate, TaskSchema, TaskUpdate
+from .service import apply_bulk_operations, completion_payload, list_tasks
+from .schema import TaskBulkRequest, TaskBulkResponse, TaskCreate, TaskListParams, TaskPage, TaskSchema, TaskUpdate
 from src.db.models import FriendLink, Task, TaskCollaborator, TaskStatus, User, Workroom, WorkroomMemberLink
 from src.auth.dependencies import get_current_user
+from src.outbox import COLLABORATOR_INVITED, TASK_COMPLETED, TASK_CREATED, outbox_relay, record_task_event
 
 task_router = APIRouter()
 
@@ -56,15 +56,31 @@ async def invite_friend_to_task(
         invited_by_id=current_user.id,
     )
     session.add(collaboration)
+    record_task_event(session, COLLABORATOR_INVITED, task_id, friend_id, {"invited_by_id": str(current_user.id)})
     await session.commit()
+    outbox_relay.notify()
     await session.refresh(collaboration)
     return {"message": f"Friend {friend.username} invited to task {task.title}"}
 
-@task_router.get("", response_model=List[TaskSchema])
-async def get_tasks(session: AsyncSession = Depends(get_session), current_user: User = Depends(get_current_user)):
-    result = await session.execute(select(Task).where(Task.created_by_id == current_user.id))
-    tasks = result.scalars().all()
-    return tasks
+@task_router.get("", response_model=TaskPage)
+async def get_tasks(
+    params: TaskListParams = Depends(),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """The current user's tasks, one page at a time"""
+    return await list_tasks(select(Task).where(Task.created_by_id == current_user.id), params, session)
+
+@task_router.post("/bulk", response_model=TaskBulkResponse)
+async def bulk_tasks(
+    request: TaskBulkRequest,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Create, update and delete many tasks in one transaction, with a status per operation"""
+    results = await apply_bulk_operations(request.operations, current_user.id, session)
+    outbox_relay.notify()
+    return {"results": results}
 
 @task_router.get("/{task_id}", response_model=TaskSchema)
 async def get_task(task_id: UUID, session: AsyncSession = Depends(get_session), current_user: User = Depends(get_current_user)):
@@ -111,7 +127,10 @@ async def create_task(
 
     # Add the task to the session and commit
     session.add(new_task)
+    await session.flush()
+    record_task_event(session, TASK_CREATED, new_task.id, current_user.id)
     await session.commit()
+    outbox_relay.notify()
     await session.refresh(new_task)
 
     return new_task
@@ -143,37 +162,20 @@ async def update_task(
                 detail="Not authorized to add tasks to this workroom."
             )
 
+    was_completed = task.status == TaskStatus.COMPLETED
     for key, value in task_update.dict(exclude_unset=True).items():
         setattr(task, key, value)
 
-    if task.status == TaskStatus.COMPLETED and task_update.status != TaskStatus.COMPLETED:
+    completed = task.status == TaskStatus.COMPLETED and not was_completed
+    if completed:
         task.completed_at = datetime.utcnow()
-        points = calculate_task_points(task)
-        current_user.xp += points
-
-        # Friend Invitation Points
-        friends_working = await get_friends_working_on_task(task_id, current_user.id, session)
-        for friend_id in friends_working:
-            friend = await session.get(User, friend_id)
-            if friend:
-                friend.xp += 5
-                session.add(friend)
-
-        # Daily Task Completion Bonus
-        if await check_daily_completion(current_user.id, session):
-            today_tasks = await session.execute(select(Task).where(Task.created_by_id == current_user.id, and_(Task.created_at >= datetime.combine(date.today(), datetime.min.time()), Task.created_at <= datetime.combine(date.today(), datetime.max.time()), Task.status == TaskStatus.COMPLETED)))
-            current_user.xp += (len(today_tasks.scalars().all()) * 2) + 10
-
-        session.add(current_user)
-        # Call check_and_award_badges after updating xp
-        await check_and_award_badges(current_user, session)
-        
-        # Update User Streak
-        await update_user_streak(current_user.id, session)
+        # XP, badges, streaks and levels are applied by the workers once this commits
+        record_task_event(session, TASK_COMPLETED, task.id, current_user.id, completion_payload(task))
 
     await session.commit()
+    if completed:
+        outbox_relay.notify()
     await session.refresh(task)
-    await session.refresh(current_user)
 
     return task
 
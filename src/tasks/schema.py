@@ -1,8 +1,10 @@
+from fastapi import Query
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Annotated, Literal, Optional, List, Union
 from datetime import datetime
 from uuid import UUID
 from src.db.models import TaskStatus
+from src.config import Config
 
 class TaskSchema(BaseModel):
     id: UUID
@@ -24,6 +26,39 @@ class TaskSchema(BaseModel):
     class Config:
         from_attributes = True
 
+TaskSort = Literal["-created_at", "created_at", "deadline", "-deadline"]
+
+
+class TaskListParams:
+    """Query parameters shared by the task list endpoints"""
+
+    def __init__(
+        self,
+        limit: int = Query(50, ge=1, le=200, description="Tasks per page"),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+        sort: TaskSort = Query("-created_at", description="Sort key; a leading - sorts newest/latest first. Tasks without a deadline come last either way"),
+        status: Optional[List[TaskStatus]] = Query(None, description="Only tasks in these statuses"),
+        category: Optional[str] = Query(None, description="Only tasks in this category"),
+        deadline_after: Optional[datetime] = Query(None, description="Deadline on or after"),
+        deadline_before: Optional[datetime] = Query(None, description="Deadline on or before"),
+        include_total: bool = Query(False, description="Also count every matching task (slower)"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.sort = sort
+        self.status = status
+        self.category = category
+        self.deadline_after = deadline_after
+        self.deadline_before = deadline_before
+        self.include_total = include_total
+
+
+class TaskPage(BaseModel):
+    tasks: List[TaskSchema]
+    next_cursor: Optional[str] = None
+    # Only filled in when the client asks for it with include_total
+    total: Optional[int] = None
+
 class TaskCollaboratorSchema(BaseModel):
     task_id: UUID
     user_id: UUID
@@ -56,4 +91,33 @@ class TaskUpdate(BaseModel):
     workroom_id: Optional[UUID] = None
     category: Optional[str] = None
     task_tools: Optional[List[str]] = None
-    
\ No newline at end of file
+
+
+class TaskBulkCreate(BaseModel):
+    op: Literal["create"]
+    task: TaskCreate
+
+class TaskBulkUpdate(BaseModel):
+    op: Literal["update"]
+    id: UUID
+    changes: TaskUpdate
+
+class TaskBulkDelete(BaseModel):
+    op: Literal["delete"]
+    id: UUID
+
+TaskBulkOperation = Annotated[Union[TaskBulkCreate, TaskBulkUpdate, TaskBulkDelete], Field(discriminator="op")]
+
+class TaskBulkRequest(BaseModel):
+    operations: List[TaskBulkOperation] = Field(..., min_length=1, max_length=Config.TASK_BULK_MAX_OPERATIONS)
+
+class TaskBulkItemResult(BaseModel):
+    index: int
+    op: str
+    # What the single-task endpoint would have answered: 201, 200, 400, 403, 404 or 409
+    status: int
+    id: Optional[UUID] = None
+    detail: Optional[str] = None
+
+class TaskBulkResponse(BaseModel):
+    results: List[TaskBulkItemResult]
@@ -1,15 +1,26 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Select, and_, delete, func, insert, select, tuple_, update
 from datetime import timedelta, datetime, date
-from typing import List
-from uuid import UUID
-from src.db.models import Task, TaskCollaborator, TaskStatus, User
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+from src.db.main import async_session
+from src.db.models import LevelCategory, Task, TaskCollaborator, TaskEvent, TaskStatus, User, Workroom, WorkroomMemberLink
+from src.outbox import COLLABORATOR_INVITED, TASK_COMPLETED, TASK_CREATED, record_task_events, task_event
+from src.achievements.service import (TASK_MASTER_BADGE, TASK_MASTER_THRESHOLD, add_level_points,
+                                      award_badge_once, record_streak_activity)
+from src.pagination import decode_cursor, encode_cursor
+from .schema import TaskListParams
+import logging
+
+# Stand-ins for a missing deadline that sort undated tasks last in either direction
+NO_DEADLINE_ASC = datetime(9999, 12, 31)
+NO_DEADLINE_DESC = datetime(1, 1, 1)
 
 
 def calculate_task_points(task: Task) -> int:
     base_points = 10
-    if task.due_date and task.completed_at:
-        time_diff = task.completed_at - task.due_date
+    if task.deadline and task.completed_at:
+        time_diff = task.completed_at - task.deadline
         if time_diff > timedelta(0):
             if time_diff <= timedelta(hours=1):
                 base_points -= 1
@@ -23,36 +34,281 @@ def calculate_task_points(task: Task) -> int:
                 base_points -= 6
             else:
                 base_points = 0
-    elif task.due_date and task.completed_at is None:
+    elif task.deadline and task.completed_at is None:
         base_points = 0
     return max(0, base_points)
 
 
-async def check_daily_completion(current_user: User, session: AsyncSession) -> bool:
-    today = date.today()
-    start_of_day = datetime.combine(today, datetime.min.time())
-    end_of_day = datetime.combine(today, datetime.max.time())
+FRIEND_COMPLETION_XP = 5
+# Level points per task created, per task completed and for completing it on time
+CREATION_LEADER_POINTS = 5
+COMPLETION_WORKAHOLIC_POINTS = 3
+ON_TIME_WORKAHOLIC_POINTS = 2
+# Team player points per collaboration, and for accepting someone else's invite
+COLLABORATION_TEAM_PLAYER_POINTS = 5
+INVITE_ACCEPTED_TEAM_PLAYER_POINTS = 3
+
+
+def completion_payload(task: Task) -> Dict:
+    """What a task_completed event needs to know about the task at the moment it completed"""
+    return {
+        "points": calculate_task_points(task),
+        "on_time": bool(task.deadline and task.completed_at and task.completed_at <= task.deadline),
+    }
+
+
+async def apply_completion_rewards(task_id: UUID, user_id: UUID, payload: Dict, day: date, session: AsyncSession) -> Dict:
+    """Award everything a task completion earns, in a fixed number of statements however many
+    tasks the user has. Returns what changed; the caller commits."""
+    points = payload["points"]
+
+    start_of_day = datetime.combine(day, datetime.min.time())
+    end_of_day = datetime.combine(day, datetime.max.time())
+    created_today = and_(Task.created_at >= start_of_day, Task.created_at <= end_of_day)
+    completed = Task.status == TaskStatus.COMPLETED
+    counts = (await session.execute(
+        select(
+            func.count().filter(created_today, Task.status != TaskStatus.COMPLETED).label("pending_today"),
+            func.count().filter(created_today, completed).label("completed_today"),
+            func.count().filter(completed).label("completed"),
+            select(User.daily_bonus_date).where(User.id == user_id).scalar_subquery().label("bonus_date"),
+        ).where(Task.created_by_id == user_id)
+    )).one()
+
+    # Daily completion bonus once nothing created that day is left open, paid once per day.
+    # apply_task_event holds the user's row lock, so no other completion can pay it meanwhile
+    daily_bonus = counts.pending_today == 0 and (counts.bonus_date is None or counts.bonus_date < day)
+    if daily_bonus:
+        points += counts.completed_today * 2 + 10
+
+    # Collaborators on the task get a flat bonus
+    collaborators = (await session.execute(
+        update(User)
+        .where(User.id.in_(
+            select(TaskCollaborator.user_id).where(
+                TaskCollaborator.task_id == task_id,
+                TaskCollaborator.user_id != user_id,
+            )
+        ))
+        .values(xp=User.xp + FRIEND_COMPLETION_XP)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
+
+    xp = (await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(xp=User.xp + points, daily_bonus_date=day if daily_bonus else User.daily_bonus_date)
+        .returning(User.xp)
+        .execution_options(synchronize_session=False)
+    )).scalar()
+
+    badges = []
+    if counts.completed >= TASK_MASTER_THRESHOLD and await award_badge_once(user_id, TASK_MASTER_BADGE, session):
+        badges.append(TASK_MASTER_BADGE)
+
+    streak = await record_streak_activity(user_id, session, today=day)
+    level_points = COMPLETION_WORKAHOLIC_POINTS + (ON_TIME_WORKAHOLIC_POINTS if payload.get("on_time") else 0)
+    tier = await add_level_points(user_id, LevelCategory.WORKAHOLIC, level_points, session)
+
+    return {
+        "xp_awarded": points,
+        "xp": xp,
+        "collaborators": [str(collaborator) for collaborator in collaborators],
+        "badges": badges,
+        "streak": streak,
+        "levels": {LevelCategory.WORKAHOLIC.value: tier.value},
+    }
+
+
+async def apply_task_event(event_id: str) -> Optional[Tuple[UUID, Dict]]:
+    """Apply one event's XP, badge, streak and level changes exactly once.
+
+    The event row is locked and marked processed in the same transaction as the rewards,
+    so redelivered or concurrently delivered events are no-ops. Returns the user to notify
+    and the notification, or None when there is nothing to send.
+    """
+    async with async_session() as session:
+        # Lock the user's row too, so one user's events are applied one at a time
+        result = await session.execute(
+            select(TaskEvent)
+            .join(User, User.id == TaskEvent.user_id)
+            .where(TaskEvent.id == UUID(event_id))
+            .with_for_update()
+        )
+        event = result.scalar()
+        if event is None or event.processed_at is not None:
+            return None
+
+        if event.event_type == TASK_COMPLETED:
+            changes = await apply_completion_rewards(
+                event.task_id, event.user_id, event.payload, event.created_at.date(), session
+            )
+        elif event.event_type == TASK_CREATED:
+            tier = await add_level_points(event.user_id, LevelCategory.LEADER, CREATION_LEADER_POINTS, session)
+            changes = {"levels": {LevelCategory.LEADER.value: tier.value}}
+        elif event.event_type == COLLABORATOR_INVITED:
+            points = COLLABORATION_TEAM_PLAYER_POINTS
+            if event.payload.get("invited_by_id") != str(event.user_id):
+                points += INVITE_ACCEPTED_TEAM_PLAYER_POINTS
+            tier = await add_level_points(event.user_id, LevelCategory.TEAM_PLAYER, points, session)
+            changes = {"levels": {LevelCategory.TEAM_PLAYER.value: tier.value}}
+        else:
+            logging.warning(f"Skipping task event {event_id} of unknown type {event.event_type}")
+            changes = None
+
+        event.processed_at = datetime.utcnow()
+        await session.commit()
+
+    if changes is None:
+        return None
+    return event.user_id, {
+        "type": "gamification",
+        "event": event.event_type,
+        "task_id": str(event.task_id),
+        **changes,
+    }
 
-    # Use SQLAlchemy's `select` instead of SQLModel's `select`
-    stmt = select(Task).where(
-        Task.created_by_id == current_user.id,
-        Task.created_at >= start_of_day,
-        Task.created_at <= end_of_day,
-        Task.status != TaskStatus.COMPLETED,
-    )
-    result = await session.execute(stmt)
-    pending_tasks = result.scalars().all()
 
-    return not pending_tasks
+def filter_tasks(query: Select, params: TaskListParams) -> Select:
+    if params.status:
+        query = query.where(Task.status.in_(params.status))
+    if params.category:
+        query = query.where(Task.category == params.category)
+    if params.deadline_after:
+        query = query.where(Task.deadline >= params.deadline_after)
+    if params.deadline_before:
+        query = query.where(Task.deadline <= params.deadline_before)
+    return query
 
 
-async def get_friends_working_on_task(task_id: UUID, current_user: User, session: AsyncSession) -> List[UUID]:
-    # Use SQLAlchemy's `select` instead of SQLModel's `select`
-    stmt = select(TaskCollaborator.user_id).where(
-        TaskCollaborator.task_id == task_id,
-        TaskCollaborator.user_id != current_user.id,
-    )
-    result = await session.execute(stmt)
-    friends_on_task = result.scalars().all()
+async def list_tasks(query: Select, params: TaskListParams, session: AsyncSession) -> Dict:
+    """One page of the tasks matched by query, paginated by (sort key, id) keyset"""
+    query = filter_tasks(query, params)
+    total = None
+    if params.include_total:
+        total = await session.scalar(query.with_only_columns(func.count(Task.id)).order_by(None))
+
+    descending = params.sort.startswith("-")
+    no_deadline = None
+    if params.sort.lstrip("-") == "deadline":
+        no_deadline = NO_DEADLINE_DESC if descending else NO_DEADLINE_ASC
+        sort_key = func.coalesce(Task.deadline, no_deadline)
+    else:
+        sort_key = Task.created_at
+
+    if params.cursor:
+        key, task_id = decode_cursor(params.cursor)
+        if descending:
+            query = query.where(tuple_(sort_key, Task.id) < tuple_(key, task_id))
+        else:
+            query = query.where(tuple_(sort_key, Task.id) > tuple_(key, task_id))
+
+    if descending:
+        query = query.order_by(sort_key.desc(), Task.id.desc())
+    else:
+        query = query.order_by(sort_key.asc(), Task.id.asc())
+
+    result = await session.execute(query.limit(params.limit + 1))
+    tasks = result.scalars().all()
+
+    next_cursor = None
+    if len(tasks) > params.limit:
+        tasks = tasks[:params.limit]
+        last = tasks[-1]
+        key = last.created_at if no_deadline is None else (last.deadline or no_deadline)
+        next_cursor = encode_cursor(key, last.id)
+
+    return {"tasks": tasks, "next_cursor": next_cursor, "total": total}
+
+
+async def apply_bulk_operations(operations: List, user_id: UUID, session: AsyncSession) -> List[Dict]:
+    """Check a batch of task operations with two lookups, then write the valid ones and their
+    task events in one transaction. Invalid operations are skipped and reported with the
+    status the single-task endpoint would have returned."""
+    results: List[Optional[Dict]] = [None] * len(operations)
+
+    def result(index: int, code: int, id: Optional[UUID] = None, detail: Optional[str] = None):
+        results[index] = {"index": index, "op": operations[index].op, "status": code, "id": id, "detail": detail}
+
+    task_ids = {operation.id for operation in operations if operation.op != "create"}
+    workroom_ids = {operation.task.workroom_id for operation in operations if operation.op == "create"}
+    workroom_ids |= {operation.changes.workroom_id for operation in operations if operation.op == "update"}
+    workroom_ids.discard(None)
+
+    tasks = {}
+    if task_ids:
+        rows = await session.execute(
+            select(Task.id, Task.created_by_id, Task.status, Task.deadline).where(Task.id.in_(task_ids))
+        )
+        tasks = {row.id: row for row in rows}
+
+    # Owner of each workroom, and whether the current user is a member, in one query
+    workrooms = {}
+    if workroom_ids:
+        rows = await session.execute(
+            select(Workroom.id, Workroom.created_by, WorkroomMemberLink.user_id.is_not(None).label("is_member"))
+            .outerjoin(WorkroomMemberLink, and_(
+                WorkroomMemberLink.workroom_id == Workroom.id,
+                WorkroomMemberLink.user_id == user_id
+            ))
+            .where(Workroom.id.in_(workroom_ids))
+        )
+        workrooms = {row.id: row for row in rows}
+
+    creates, updates, deletes, events = [], [], [], []
+    seen = set()
+    now = datetime.utcnow()
+    for index, operation in enumerate(operations):
+        if operation.op == "create":
+            workroom_id = operation.task.workroom_id
+            if workroom_id and workroom_id not in workrooms:
+                result(index, 400, detail=f"Workroom with ID {workroom_id} does not exist.")
+            elif workroom_id and not workrooms[workroom_id].is_member:
+                result(index, 403, detail="You are not a member of this workroom.")
+            else:
+                # Leave unset fields out so column defaults apply, as they do for POST /tasks
+                row = {**operation.task.model_dump(exclude_none=True), "id": uuid4(), "created_by_id": user_id}
+                creates.append(row)
+                events.append(task_event(TASK_CREATED, row["id"], user_id))
+                result(index, 201, id=row["id"])
+            continue
+
+        task = tasks.get(operation.id)
+        if operation.id in seen:
+            result(index, 409, operation.id, "Task appears more than once in this batch")
+        elif not task:
+            result(index, 404, operation.id, "Task not found")
+        elif task.created_by_id != user_id:
+            result(index, 403, operation.id, f"Not authorized to {operation.op} this task")
+        elif operation.op == "delete":
+            deletes.append(operation.id)
+            result(index, 200, operation.id)
+        else:
+            changes = operation.changes.model_dump(exclude_unset=True)
+            workroom_id = changes.get("workroom_id")
+            if workroom_id and workroom_id not in workrooms:
+                result(index, 400, operation.id, f"Workroom with ID {workroom_id} does not exist.")
+            elif workroom_id and workrooms[workroom_id].created_by != user_id:
+                result(index, 403, operation.id, "Not authorized to add tasks to this workroom.")
+            else:
+                if changes.get("status") == TaskStatus.COMPLETED and task.status != TaskStatus.COMPLETED:
+                    changes["completed_at"] = now
+                    completed = Task(deadline=changes.get("deadline", task.deadline), completed_at=now)
+                    events.append(task_event(TASK_COMPLETED, operation.id, user_id, completion_payload(completed)))
+                if changes:
+                    updates.append({**changes, "id": operation.id, "updated_at": now})
+                result(index, 200, operation.id)
+        seen.add(operation.id)
+
+    # Multi-row INSERT, UPDATEs by primary key sent as one executemany, one DELETE
+    if creates:
+        await session.execute(insert(Task), creates)
+    if updates:
+        await session.execute(update(Task), updates)
+    if deletes:
+        await session.execute(delete(Task).where(Task.id.in_(deletes)))
+    await record_task_events(session, events)
+    await session.commit()
 
-    return list(friends_on_task)
\ No newline at end of file
+    return results
@@ -0,0 +1,212 @@
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from collections import defaultdict
+import asyncio
+
+
+class TypingAggregator:
+    """Collects typing state per workroom and emits one "who is typing" frame per window.
+
+    The frame lists every member currently typing (including the recipient, whose client
+    filters itself out), so one encoded frame serves the whole room. Typers that stop
+    sending updates expire after `ttl` seconds.
+    """
+
+    def __init__(self, emit: Callable[[str, dict], None], window: float, ttl: float):
+        self.emit = emit
+        self.window = window
+        self.ttl = ttl
+        # workroom_id: {user_id: (user_data, expires_at)}
+        self.typers: Dict[str, Dict[str, Tuple[dict, float]]] = defaultdict(dict)
+        self.last_sent: Dict[str, frozenset] = {}
+        self.flush_tasks: Dict[str, asyncio.Task] = {}
+
+    def update(self, workroom_id: str, user_data: dict, is_typing: bool) -> bool:
+        """Record a typing event; returns True if it changed state or refreshed a stale entry"""
+        user_id = str(user_data.get('id'))
+        now = asyncio.get_running_loop().time()
+        previous = self.typers[workroom_id].get(user_id)
+
+        if is_typing:
+            self.typers[workroom_id][user_id] = (user_data, now + self.ttl)
+            changed = previous is None or previous[1] - now < self.ttl / 2
+        else:
+            self.typers[workroom_id].pop(user_id, None)
+            changed = previous is not None
+
+        self._schedule(workroom_id)
+        return changed
+
+    def remove_user(self, workroom_id: str, user_id: str) -> bool:
+        """Forget a typer, e.g. when their socket goes away"""
+        if self.typers.get(workroom_id, {}).pop(user_id, None) is None:
+            return False
+        self._schedule(workroom_id)
+        return True
+
+    def typing_users(self, workroom_id: str) -> list:
+        return [user_data for user_data, _ in self.typers.get(workroom_id, {}).values()]
+
+    def close(self):
+        for task in list(self.flush_tasks.values()):
+            task.cancel()
+        self.flush_tasks.clear()
+
+    def _schedule(self, workroom_id: str):
+        if workroom_id not in self.flush_tasks:
+            self.flush_tasks[workroom_id] = asyncio.create_task(self._flush_loop(workroom_id))
+
+    async def _flush_loop(self, workroom_id: str):
+        try:
+            while True:
+                await asyncio.sleep(self.window)
+                now = asyncio.get_running_loop().time()
+                typers = self.typers.get(workroom_id, {})
+                for user_id, (_, expires_at) in list(typers.items()):
+                    if expires_at <= now:
+                        del typers[user_id]
+
+                current = frozenset(typers)
+                if current != self.last_sent.get(workroom_id, frozenset()):
+                    self.last_sent[workroom_id] = current
+                    self.emit(workroom_id, {
+                        'type': 'typing',
+                        'users': self.typing_users(workroom_id)
+                    })
+
+                if not typers:
+                    self.typers.pop(workroom_id, None)
+                    self.last_sent.pop(workroom_id, None)
+                    break
+        finally:
+            self.flush_tasks.pop(workroom_id, None)
+
+
+class PresenceBatcher:
+    """Collapses presence join/leave events per workroom over a short window.
+
+    Only the latest event per user survives a window. A window with a single event sends
+    it unchanged; otherwise one `presence_batch` frame carries all of them.
+    """
+
+    def __init__(self, emit: Callable[..., Awaitable[None]], window: float):
+        self.emit = emit
+        self.window = window
+        # workroom_id: {user_id: presence message}
+        self.pending: Dict[str, Dict[str, dict]] = defaultdict(dict)
+        self.flush_tasks: Dict[str, asyncio.Task] = {}
+
+    async def add(self, workroom_id: str, event: dict):
+        user_id = str((event.get('user') or {}).get('id'))
+        if self.window <= 0:
+            await self._send(workroom_id, {user_id: event})
+            return
+
+        self.pending[workroom_id][user_id] = event
+        if workroom_id not in self.flush_tasks:
+            self.flush_tasks[workroom_id] = asyncio.create_task(self._flush(workroom_id))
+
+    def close(self):
+        for task in list(self.flush_tasks.values()):
+            task.cancel()
+        self.flush_tasks.clear()
+
+    async def _flush(self, workroom_id: str):
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            self.flush_tasks.pop(workroom_id, None)
+        events = self.pending.pop(workroom_id, {})
+        if events:
+            await self._send(workroom_id, events)
+
+    async def _send(self, workroom_id: str, events: Dict[str, dict]):
+        if len(events) == 1:
+            user_id, event = next(iter(events.items()))
+            # A joining user already gets the full session state, not their own join
+            exclude = [user_id] if event.get('action') == 'join' else None
+            await self.emit(workroom_id, event, exclude=exclude)
+        else:
+            await self.emit(workroom_id, {
+                'type': 'presence_batch',
+                'events': list(events.values())
+            })
+
+
+class SignalBatcher:
+    """Coalesces trickled ICE candidates per sender→target pair over a few milliseconds.
+
+    A window holding a single signal sends it unchanged as `webrtc_signal`; otherwise one
+    `webrtc_signal_batch` frame carries the candidates in order. Offers and answers are
+    never held back: they flush whatever is pending for the pair first, then go out.
+    """
+
+    def __init__(self, emit: Callable[[str, str, dict], Awaitable[None]], window: float):
+        self.emit = emit
+        self.window = window
+        # (workroom_id, sender_id, target_id): signals in arrival order
+        self.pending: Dict[Tuple[str, str, str], List[Any]] = {}
+        self.flush_tasks: Dict[Tuple[str, str, str], asyncio.Task] = {}
+        self.relayed = 0
+        self.frames = 0
+
+    @staticmethod
+    def is_candidate(signal: Any) -> bool:
+        return isinstance(signal, dict) and ('candidate' in signal or signal.get('type') == 'candidate')
+
+    async def add(self, workroom_id: str, sender_id: str, target_id: str, signal: Any):
+        key = (workroom_id, sender_id, target_id)
+        if self.window <= 0 or not self.is_candidate(signal):
+            await self.flush(key)
+            await self._send(key, [signal])
+            return
+
+        self.pending.setdefault(key, []).append(signal)
+        if key not in self.flush_tasks:
+            self.flush_tasks[key] = asyncio.create_task(self._flush_later(key))
+
+    async def flush(self, key: Tuple[str, str, str]):
+        """Send a pair's pending candidates now"""
+        task = self.flush_tasks.pop(key, None)
+        if task:
+            task.cancel()
+        signals = self.pending.pop(key, None)
+        if signals:
+            await self._send(key, signals)
+
+    def remove_user(self, workroom_id: str, user_id: str):
+        """Drop candidates to or from a user who left"""
+        for key in [key for key in self.pending if key[0] == workroom_id and user_id in key[1:]]:
+            self.pending.pop(key, None)
+            task = self.flush_tasks.pop(key, None)
+            if task:
+                task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {'signals_relayed': self.relayed, 'signal_frames': self.frames}
+
+    def close(self):
+        for task in list(self.flush_tasks.values()):
+            task.cancel()
+        self.flush_tasks.clear()
+        self.pending.clear()
+
+    async def _flush_later(self, key: Tuple[str, str, str]):
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            # flush() may already have replaced this task with a newer one
+            if self.flush_tasks.get(key) is asyncio.current_task():
+                del self.flush_tasks[key]
+        signals = self.pending.pop(key, None)
+        if signals:
+            await self._send(key, signals)
+
+    async def _send(self, key: Tuple[str, str, str], signals: List[Any]):
+        workroom_id, sender_id, target_id = key
+        self.relayed += len(signals)
+        self.frames += 1
+        if len(signals) == 1:
+            message = {'type': 'webrtc_signal', 'signal': signals[0], 'sender': sender_id}
+        else:
+            message = {'type': 'webrtc_signal_batch', 'signals': signals, 'sender': sender_id}
+        await self.emit(workroom_id, target_id, message)
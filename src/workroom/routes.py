@@ -1,20 +1,21 @@
 from fastapi import Body, APIRouter, HTTPException, Depends, status, Query
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from src.db.main import get_session
 from .service import update_workroom_leaderboard
-from .schema import WorkroomCreate, WorkroomSchema, WorkroomTaskCreate, WorkroomUpdate
+from .schema import ChatHistoryPage, WorkroomCreate, WorkroomSchema, WorkroomTaskCreate, WorkroomUpdate
 from typing import List, Optional, Dict, Any
 from uuid import UUID
-from src.db.models import Workroom, User, Task, Leaderboard, TaskStatus, WorkroomMemberLink, WorkroomLiveSession
+from src.db.models import Workroom, User, Task, Leaderboard, TaskStatus, WorkroomMemberLink, WorkroomLiveSession, WorkroomChatMessage
 from src.auth.dependencies import get_current_user
 from src.auth.schema import UserSchema
-from src.tasks.schema import TaskSchema
+from src.tasks.schema import TaskListParams, TaskPage, TaskSchema
+from src.tasks.service import list_tasks
 from datetime import datetime
-from src.manager import WebSocketManager
-
-manager = WebSocketManager()
+from src.manager import manager
+from src.pagination import decode_cursor, encode_cursor
+from src.outbox import TASK_CREATED, outbox_relay, record_task_event
 
 
 workroom_router = APIRouter()
@@ -178,13 +179,12 @@ async def remove_members_from_workroom(
 
 # Task Management (Related to Workrooms)
 
-@workroom_router.get("/{workroom_id}/tasks", response_model=List[TaskSchema])
+@workroom_router.get("/{workroom_id}/tasks", response_model=TaskPage)
 async def get_workroom_tasks(
     workroom_id: UUID,
+    params: TaskListParams = Depends(),
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
-    status: Optional[TaskStatus] = Query(None, description="Filter by task status"),
-    due_date: Optional[datetime] = Query(None, description="Filter by due date"),
 ):
     workroom = await session.get(Workroom, workroom_id)
     if not workroom:
@@ -192,16 +192,7 @@ async def get_workroom_tasks(
     if workroom.created_by != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access tasks for this workroom")
 
-    query = select(Task).where(Task.workroom_id == workroom_id)
-
-    if status:
-        query = query.where(Task.status == status)
-    if due_date:
-        query = query.where(Task.due_date == due_date)
-
-    result = await session.execute(query)
-    tasks = result.scalars().all()
-    return tasks
+    return await list_tasks(select(Task).where(Task.workroom_id == workroom_id), params, session)
 
 @workroom_router.post("/{workroom_id}/tasks", response_model=TaskSchema, status_code=status.HTTP_201_CREATED)
 async def create_task_in_workroom(
@@ -222,7 +213,10 @@ async def create_task_in_workroom(
     new_task.workroom_id = workroom_id
 
     session.add(new_task)
+    await session.flush()
+    record_task_event(session, TASK_CREATED, new_task.id, current_user.id)
     await session.commit()
+    outbox_relay.notify()
     await session.refresh(new_task)
     return new_task
 
@@ -260,7 +254,7 @@ async def get_live_session_info(
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
-    """Get information about active live session in workroom"""
+    """Get information about active live session in workroom, with participants from every node"""
     # Verify workroom access
     workroom = await session.get(Workroom, workroom_id)
     if not workroom:
@@ -269,26 +263,23 @@ async def get_live_session_info(
     if not await manager.verify_workroom_access(str(current_user.id), str(workroom_id), session):
         raise HTTPException(status_code=403, detail="No access to this workroom")
     
-    # Get live session info
-    live_session = await manager.get_or_create_live_session(str(workroom_id), session)
-    
-    # Get participants
-    participants = []
-    for user_id in manager.active_connections.get(str(workroom_id), {}).keys():
-        user_data = await manager.get_user_data(user_id, session)
-        participants.append(user_data)
+    # Read-only: a GET never starts a session
+    live_session = await manager.find_live_session(str(workroom_id), session)
     
-    # Get screen sharer data if any
-    screen_sharer_data = None
-    if live_session.screen_sharer_id:
-        screen_sharer_data = await manager.get_user_data(live_session.screen_sharer_id, session)
+    # Get participants and screen sharer data in one lookup
+    participant_ids = await manager.participants(str(workroom_id))
+    screen_sharer_id = live_session.screen_sharer_id if live_session else None
+    users_data = await manager.get_users_data(participant_ids + ([screen_sharer_id] if screen_sharer_id else []), session)
+
+    participants = [users_data[user_id] for user_id in participant_ids if user_id in users_data]
+    screen_sharer_data = users_data.get(screen_sharer_id) if screen_sharer_id else None
     
     return {
-        "session_id": str(live_session.id),
-        "is_active": live_session.is_active,
+        "session_id": str(live_session.id) if live_session else None,
+        "is_active": live_session is not None,
         "screen_sharer": screen_sharer_data,
         "participants": participants,
-        "started_at": live_session.created_at.isoformat() if live_session.created_at else None,
+        "started_at": live_session.created_at.isoformat() if live_session and live_session.created_at else None,
         "workroom_id": str(workroom_id)
     }
 
@@ -339,6 +330,44 @@ async def end_live_session(
         "workroom_id": str(workroom_id)
     }
     
+@workroom_router.get("/{workroom_id}/chat", response_model=ChatHistoryPage)
+async def get_workroom_chat_history(
+    workroom_id: UUID,
+    limit: int = Query(50, ge=1, le=200, description="Messages per page"),
+    before: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Chat history, newest first, paginated by (created_at, id) keyset"""
+    workroom = await session.get(Workroom, workroom_id)
+    if not workroom:
+        raise HTTPException(status_code=404, detail="Workroom not found")
+
+    if not await manager.verify_workroom_access(str(current_user.id), str(workroom_id), session):
+        raise HTTPException(status_code=403, detail="No access to this workroom")
+
+    query = (
+        select(WorkroomChatMessage)
+        .where(WorkroomChatMessage.workroom_id == workroom_id)
+        .order_by(WorkroomChatMessage.created_at.desc(), WorkroomChatMessage.id.desc())
+        .limit(limit + 1)
+    )
+    if before:
+        created_at, message_id = decode_cursor(before)
+        query = query.where(
+            tuple_(WorkroomChatMessage.created_at, WorkroomChatMessage.id) < tuple_(created_at, message_id)
+        )
+
+    result = await session.execute(query)
+    messages = result.scalars().all()
+
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1].created_at, messages[-1].id)
+
+    return {"messages": messages, "next_cursor": next_cursor}
+
 @workroom_router.post("/{workroom_id}/request-access")
 async def request_workroom_access(
     workroom_id: UUID,
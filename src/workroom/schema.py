@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from src.db.models import TaskStatus
 from datetime import datetime
 from uuid import UUID
@@ -48,4 +48,19 @@ class LeaderboardSchema(BaseModel):
     rank: Optional[int] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ChatMessageSchema(BaseModel):
+    id: UUID
+    workroom_id: UUID
+    sender_id: Optional[UUID] = None
+    content: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ChatHistoryPage(BaseModel):
+    messages: List[ChatMessageSchema]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,104 @@
+# Idle workroom sockets must not hold pooled database connections: 500 of them stay
+# connected while the pool (20 + 20 overflow) remains free for requests.
+# Needs Postgres at DATABASE_URL (and the usual .env so src.config loads).
+
+import asyncio
+import os
+import uuid
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("needs Postgres at DATABASE_URL", allow_module_level=True)
+
+from sqlalchemy import delete, insert, text
+from starlette.websockets import WebSocket
+from src import workroom_websocket_endpoint
+from src.auth.utils import create_access_tokens
+from src.db.main import async_session, engine, init_db
+from src.db.models import User, Workroom, WorkroomMemberLink
+from src.manager import manager
+
+IDLE_SOCKETS = 500
+
+
+def idle_socket(workroom_id: str, hang_up: asyncio.Event, idle: set) -> WebSocket:
+    """A client that connects, never sends anything, and leaves once hang_up is set"""
+    pending = [{"type": "websocket.connect"}]
+
+    async def receive():
+        if pending:
+            return pending.pop()
+        # The endpoint is now waiting on the client, past connect
+        idle.add(websocket)
+        await hang_up.wait()
+        return {"type": "websocket.disconnect", "code": 1000}
+
+    async def send(message):
+        pass
+
+    scope = {
+        "type": "websocket",
+        "path": f"/api/v1/workrooms/{workroom_id}/ws",
+        "query_string": b"",
+        "headers": [],
+        "subprotocols": [],
+    }
+    websocket = WebSocket(scope, receive, send)
+    return websocket
+
+
+async def wait_for(condition, timeout: float = 60.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+
+async def hold_idle_sockets():
+    await init_db()
+    user_ids = [uuid.uuid4() for _ in range(IDLE_SOCKETS)]
+    async with async_session() as session:
+        await session.execute(insert(User), [
+            {"id": user_id, "email": f"idle-{user_id}@example.com", "password_hash": "x"} for user_id in user_ids
+        ])
+        workroom = Workroom(name="idle sockets", created_by=user_ids[0])
+        session.add(workroom)
+        await session.flush()
+        await session.execute(insert(WorkroomMemberLink), [
+            {"workroom_id": workroom.id, "user_id": user_id} for user_id in user_ids
+        ])
+        await session.commit()
+    workroom_id = str(workroom.id)
+
+    hang_up = asyncio.Event()
+    idle = set()
+    endpoints = [
+        asyncio.create_task(workroom_websocket_endpoint(
+            idle_socket(workroom_id, hang_up, idle),
+            workroom_id,
+            create_access_tokens({"user_uid": str(user_id)}),
+        ))
+        for user_id in user_ids
+    ]
+    try:
+        await wait_for(lambda: len(idle) == IDLE_SOCKETS)
+        assert manager.registry.room_size(workroom_id) == IDLE_SOCKETS
+        assert engine.pool.checkedout() == 0, f"{engine.pool.checkedout()} connections held by idle sockets"
+
+        # A request still gets a connection straight away
+        async with async_session() as session:
+            assert await asyncio.wait_for(session.scalar(text("SELECT 1")), 5) == 1
+    finally:
+        hang_up.set()
+        await asyncio.gather(*endpoints, return_exceptions=True)
+        async with async_session() as session:
+            # Core DELETE so the database's ON DELETE CASCADE clears the workroom and its links
+            await session.execute(delete(User).where(User.id.in_(user_ids)))
+            await session.commit()
+        await engine.dispose()
+
+    assert not manager.registry.has_room(workroom_id)
+
+
+def test_idle_sockets_do_not_hold_pool_connections():
+    asyncio.run(hold_idle_sockets())
@@ -0,0 +1,129 @@
+# Completing a task costs a fixed number of statements however long the user's task history
+# is, both in the request and when the workers apply its task_completed event.
+# Needs Postgres at DATABASE_URL (and the usual .env so src.config loads).
+
+import asyncio
+import os
+import uuid
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("needs Postgres at DATABASE_URL", allow_module_level=True)
+
+from sqlalchemy import delete, event, exists, insert, select
+from src.db.main import async_session, engine, init_db
+from src.db.models import Badge, Task, TaskCollaborator, TaskEvent, TaskStatus, User, UserBadgeLink
+from src.achievements.service import TASK_MASTER_BADGE
+from src.tasks.routes import update_task
+from src.tasks.service import apply_task_event
+from src.tasks.schema import TaskUpdate
+
+HISTORIES = (10, 1000)
+# Task load, task update, event insert, refresh
+MAX_REQUEST_STATEMENTS = 4
+# Event lock, counts, collaborator xp, user xp, badge, streak, level, event update
+MAX_EVENT_STATEMENTS = 8
+# XP for completing an undated task, before any daily bonus
+COMPLETION_XP = 10
+
+statements = 0
+
+
+def count_statement(*args):
+    global statements
+    statements += 1
+
+
+async def ensure_badge() -> bool:
+    """Make sure the badge completions award exists; True when this test created it"""
+    async with async_session() as session:
+        if await session.scalar(select(exists().where(Badge.name == TASK_MASTER_BADGE))):
+            return False
+        session.add(Badge(name=TASK_MASTER_BADGE))
+        await session.commit()
+        return True
+
+
+async def complete_twice(history: int):
+    """Complete two tasks for a user with `history` completed tasks and a collaborator, counting
+    statements in the request and in applying each event. The second completion takes the
+    streak UPDATE path instead of the first-time INSERT."""
+    global statements
+    async with async_session() as session:
+        user = User(email=f"test-{uuid.uuid4()}@example.com", password_hash="x")
+        friend = User(email=f"test-{uuid.uuid4()}@example.com", password_hash="x")
+        session.add_all([user, friend])
+        await session.flush()
+        await session.execute(insert(Task), [
+            {"title": f"Done {index}", "created_by_id": user.id, "status": TaskStatus.COMPLETED, "deadline": None}
+            for index in range(history)
+        ])
+        task = Task(title="Finish me", created_by_id=user.id, deadline=None)
+        session.add(task)
+        await session.flush()
+        session.add(TaskCollaborator(task_id=task.id, user_id=friend.id, invited_by_id=user.id))
+        await session.commit()
+
+    counts = []
+    awarded = []
+    try:
+        for attempt in range(2):
+            async with async_session() as session:
+                if attempt:
+                    task = Task(title="Finish me too", created_by_id=user.id, deadline=None)
+                    session.add(task)
+                    await session.commit()
+                current_user = await session.merge(user, load=False)
+                statements = 0
+                await update_task(task.id, TaskUpdate(status=TaskStatus.COMPLETED), session, current_user)
+                request = statements
+                event_id = (await session.execute(
+                    select(TaskEvent.id).where(TaskEvent.task_id == task.id)
+                )).scalar()
+
+            statements = 0
+            applied = await apply_task_event(str(event_id))
+            assert applied is not None
+            counts.append((request, statements))
+            awarded.append(applied[1]["xp_awarded"])
+            assert await apply_task_event(str(event_id)) is None, "redelivered event was applied again"
+
+        async with async_session() as session:
+            friend_xp = (await session.get(User, friend.id)).xp
+            has_badge = await session.scalar(select(exists().where(
+                UserBadgeLink.user_id == user.id,
+                UserBadgeLink.badge_id == Badge.id,
+                Badge.name == TASK_MASTER_BADGE,
+            )))
+        return counts, awarded, friend_xp, has_badge
+    finally:
+        async with async_session() as session:
+            # Core DELETE so the database's ON DELETE CASCADE clears tasks, streaks and badges
+            await session.execute(delete(User).where(User.id.in_([user.id, friend.id])))
+            await session.commit()
+
+
+async def complete_tasks():
+    await init_db()
+    created_badge = await ensure_badge()
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        for history in HISTORIES:
+            counts, awarded, friend_xp, has_badge = await complete_twice(history)
+            for request, applied in counts:
+                assert request <= MAX_REQUEST_STATEMENTS, f"the request took {request} statements"
+                assert applied <= MAX_EVENT_STATEMENTS, f"applying the event took {applied} statements"
+            assert has_badge and friend_xp == 5, "completion rewards were not applied"
+            # Both days are clear of open tasks, but the daily bonus is paid only once
+            assert awarded[0] > COMPLETION_XP and awarded[1] == COMPLETION_XP, f"xp awarded {awarded}"
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+        if created_badge:
+            async with async_session() as session:
+                await session.execute(delete(Badge).where(Badge.name == TASK_MASTER_BADGE))
+                await session.commit()
+        await engine.dispose()
+
+
+def test_task_completion_statement_counts():
+    asyncio.run(complete_tasks())